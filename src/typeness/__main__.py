@@ -1,6 +1,11 @@
 import argparse
 
+from typeness.audio import PREROLL_SECONDS
+from typeness.backend import BACKENDS
+from typeness.debug import DEBUG_MAX_AGE_DAYS, DEBUG_MAX_MB
 from typeness.main import main
+from typeness.pipeline import MAX_QUEUE_DEPTH
+from typeness.quantize import QUANTIZE_MODES
 
 
 def cli():
@@ -12,10 +17,141 @@ def cli():
     parser.add_argument(
         "--debug",
         action="store_true",
-        help="save each recording as WAV + JSON to the debug/ directory",
+        help="save each recording to the capture store in the debug/ directory",
+    )
+    parser.add_argument(
+        "--debug-max-mb",
+        type=float,
+        default=DEBUG_MAX_MB,
+        help=f"delete the oldest debug captures beyond this much audio (default: {DEBUG_MAX_MB:g})",
+    )
+    parser.add_argument(
+        "--debug-max-days",
+        type=float,
+        default=DEBUG_MAX_AGE_DAYS,
+        help=f"delete debug captures older than this (default: {DEBUG_MAX_AGE_DAYS:g})",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="transcribe in the background while recording (lower stop-to-paste latency)",
+    )
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="speed up LLM post-processing with prompt-lookup speculative decoding",
+    )
+    parser.add_argument(
+        "--stream-output",
+        action="store_true",
+        help="paste LLM output sentence by sentence while it is being generated",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="always run the LLM, even for short transcripts that need no restructuring",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=MAX_QUEUE_DEPTH,
+        help=f"maximum recordings queued or in processing at once (default: {MAX_QUEUE_DEPTH})",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        default=None,
+        help="append hot-path timing spans to this JSONL file",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve span histograms in Prometheus text format on localhost:PORT/metrics",
+    )
+    parser.add_argument(
+        "--int16-capture",
+        action="store_true",
+        help="buffer recordings as 16-bit PCM (half the memory of float32)",
+    )
+    parser.add_argument(
+        "--persistent-stream",
+        action="store_true",
+        help="keep the microphone open between recordings (no device-open delay, adds pre-roll)",
+    )
+    parser.add_argument(
+        "--preroll-ms",
+        type=int,
+        default=int(PREROLL_SECONDS * 1000),
+        help=f"audio kept from before the hotkey press with --persistent-stream "
+             f"(default: {int(PREROLL_SECONDS * 1000)})",
+    )
+    parser.add_argument(
+        "--no-vad",
+        action="store_true",
+        help="send the full recording to Whisper without trimming silence",
+    )
+    parser.add_argument(
+        "--auto-stop",
+        type=float,
+        metavar="SECONDS",
+        default=None,
+        help="end a recording automatically after this much silence following speech",
+    )
+    parser.add_argument(
+        "--chunked-long-audio",
+        action="store_true",
+        help="transcribe recordings over 30 s as batched silence-cut windows",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="run synthetic audio and text through both models after loading",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="compile both models with torch.compile and a static KV cache (implies --warmup)",
+    )
+    parser.add_argument(
+        "--quantize",
+        choices=QUANTIZE_MODES,
+        default=None,
+        help="load both models with dynamic int8 Linear layers (CPU only; less RAM, faster)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="torch",
+        help="inference engine: PyTorch, or ONNX Runtime on CPU (needs optimum[onnxruntime])",
     )
     args = parser.parse_args()
-    main(debug=args.debug)
+    if args.compile and args.quantize is not None:
+        parser.error("--compile cannot be combined with --quantize")
+    if args.backend == "onnx" and (args.compile or args.quantize is not None):
+        parser.error("--backend onnx cannot be combined with --compile or --quantize")
+    main(
+        debug=args.debug,
+        streaming=args.streaming,
+        speculative=args.speculative,
+        fast_path=not args.no_fast_path,
+        queue_depth=args.queue_depth,
+        trace_path=args.trace,
+        metrics_port=args.metrics_port,
+        int16_capture=args.int16_capture,
+        persistent_stream=args.persistent_stream,
+        preroll_seconds=args.preroll_ms / 1000,
+        vad=not args.no_vad,
+        auto_stop_seconds=args.auto_stop,
+        chunked_long_audio=args.chunked_long_audio,
+        warmup=args.warmup,
+        compile=args.compile,
+        quantize=args.quantize,
+        backend=args.backend,
+        stream_output=args.stream_output,
+        debug_max_mb=args.debug_max_mb,
+        debug_max_age_days=args.debug_max_days,
+    )
 
 
 if __name__ == "__main__":
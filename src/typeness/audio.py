@@ -3,59 +3,268 @@
 Captures microphone input via sounddevice with start/stop control.
 """
 
+import threading
+import time
+from collections.abc import Callable
+
 import numpy as np
 import sounddevice as sd
 
+from typeness import tracing
+
 SAMPLE_RATE = 16000
 CHANNELS = 1
 DTYPE = "float32"
 MIN_RECORDING_SECONDS = 0.3
+# Initial capture buffer size; it doubles whenever a recording outgrows it
+CAPTURE_INITIAL_SECONDS = 30.0
+# Audio kept from just before the hotkey press in persistent-stream mode
+PREROLL_SECONDS = 0.3
+
+
+class CaptureBuffer:
+    """Growable, preallocated sample buffer for one recording.
+
+    Each callback block is written in place into a NumPy array that doubles
+    when full, so there are no per-callback allocations and no final
+    concatenation. Samples are never modified once written, so the arrays
+    returned by append() and snapshot() stay valid while recording goes on
+    (after a grow, new writes simply go to the new array). With int16
+    storage memory is halved, but reads are converted copies.
+    """
+
+    def __init__(self, initial_seconds: float = CAPTURE_INITIAL_SECONDS,
+                 dtype=np.float32) -> None:
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(int(initial_seconds * SAMPLE_RATE), dtype=self.dtype)
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _as_float(self, samples: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int16:
+            return samples.astype(np.float32) / 32767.0
+        return samples
+
+    def append(self, samples: np.ndarray) -> np.ndarray:
+        """Append mono float32 samples and return them as stored (float32)."""
+        samples = samples.reshape(-1)
+        with self._lock:
+            start = self._length
+            end = start + len(samples)
+            if end > len(self._data):
+                grown = np.empty(max(end, 2 * len(self._data)), dtype=self.dtype)
+                grown[:start] = self._data[:start]
+                self._data = grown
+            if self.dtype == np.int16:
+                self._data[start:end] = (samples * 32767).clip(-32768, 32767)
+            else:
+                self._data[start:end] = samples
+            self._length = end
+            data = self._data
+        return self._as_float(data[start:end])
+
+    def snapshot(self, start: int = 0) -> np.ndarray:
+        """Samples from `start` to the current end as float32.
+
+        Safe to call from any thread while recording continues; zero-copy
+        for float32 storage.
+        """
+        with self._lock:
+            data, end = self._data, self._length
+        return self._as_float(data[start:end])
+
+
+class _PrerollRing:
+    """Fixed-size ring of the most recent samples captured while idle."""
+
+    def __init__(self, seconds: float) -> None:
+        self._data = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+        self._pos = 0
+        self._filled = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        size = len(self._data)
+        if size == 0:
+            return
+        samples = samples.reshape(-1)[-size:]
+        end = self._pos + len(samples)
+        if end <= size:
+            self._data[self._pos:end] = samples
+        else:
+            split = size - self._pos
+            self._data[self._pos:] = samples[:split]
+            self._data[:end - size] = samples[split:]
+        self._pos = end % size
+        self._filled = min(self._filled + len(samples), size)
+
+    def take(self) -> np.ndarray:
+        """Return the buffered samples in order and empty the ring."""
+        if self._filled < len(self._data):
+            samples = self._data[:self._filled].copy()
+        else:
+            samples = np.concatenate((self._data[self._pos:], self._data[:self._pos]))
+        self._pos = 0
+        self._filled = 0
+        return samples
+
 
 _audio_stream: sd.InputStream | None = None
-_audio_chunks: list[np.ndarray] = []
+_capture: CaptureBuffer | None = None
+_chunk_listeners: list[Callable[[np.ndarray], None]] = []
+# Guards _capture / _preroll against the audio callback thread
+_capture_lock = threading.Lock()
+# Persistent-stream mode: the stream stays open and recording is gated on
+# _capture; while idle, audio goes to the pre-roll ring instead
+_persistent = False
+_preroll: _PrerollRing | None = None
+
+# Measurements of the most recent stream open and recording start
+last_device_open_seconds: float | None = None
+last_preroll_seconds = 0.0
 
 
 def _audio_callback(indata: np.ndarray, frames: int, time_info, status) -> None:
     if status:
         print(f"  [audio warning] {status}")
-    _audio_chunks.append(indata.copy())
+    with _capture_lock:
+        if _capture is None:
+            if _preroll is not None:
+                _preroll.write(indata)
+            return
+        chunk = _capture.append(indata)
+        for listener in _chunk_listeners:
+            listener(chunk)
+
 
+def add_chunk_listener(listener: Callable[[np.ndarray], None]) -> None:
+    """Register a callable that receives every captured chunk while recording.
 
-def record_audio_start() -> None:
-    """Start recording audio from the microphone."""
-    global _audio_stream
-    _audio_chunks.clear()
-    _audio_stream = sd.InputStream(
+    Listeners run on the audio callback thread, so they must return quickly
+    (e.g. just enqueue the chunk). Chunks are 1-D float32 arrays that stay
+    valid after the callback returns.
+    """
+    _chunk_listeners.append(listener)
+
+
+def remove_chunk_listener(listener: Callable[[np.ndarray], None]) -> None:
+    """Unregister a chunk listener added with add_chunk_listener()."""
+    if listener in _chunk_listeners:
+        _chunk_listeners.remove(listener)
+
+
+def capture_snapshot(start: int = 0) -> np.ndarray:
+    """Samples of the current recording from `start` onwards (thread-safe)."""
+    capture = _capture
+    if capture is None:
+        return np.array([], dtype=np.float32)
+    return capture.snapshot(start)
+
+
+def _open_stream() -> sd.InputStream:
+    """Open and start an input stream, recording how long the device took."""
+    global last_device_open_seconds
+    start = time.perf_counter()
+    stream = sd.InputStream(
         samplerate=SAMPLE_RATE,
         channels=CHANNELS,
         dtype=DTYPE,
         callback=_audio_callback,
     )
-    _audio_stream.start()
-    print("Recording...")
+    stream.start()
+    last_device_open_seconds = time.perf_counter() - start
+    tracing.record("audio.device_open", last_device_open_seconds)
+    return stream
 
 
-def stop_stream() -> None:
-    """Stop and close the audio stream if active (for cleanup on shutdown)."""
-    global _audio_stream
+def start_persistent_stream(preroll_seconds: float = PREROLL_SECONDS) -> None:
+    """Keep the input stream open between recordings.
+
+    Recording then only toggles where captured audio goes, so there is no
+    device-open delay on the hotkey, and the last preroll_seconds before
+    each press are prepended to the recording.
+    """
+    global _audio_stream, _persistent, _preroll
     if _audio_stream is not None:
-        _audio_stream.stop()
-        _audio_stream.close()
-        _audio_stream = None
+        return
+    with _capture_lock:
+        _preroll = _PrerollRing(preroll_seconds)
+    _persistent = True
+    _audio_stream = _open_stream()
+    print(f"Input stream open (device open {last_device_open_seconds * 1000:.0f} ms, "
+          f"pre-roll {preroll_seconds * 1000:.0f} ms)")
+
+
+def record_audio_start(*, int16: bool = False) -> None:
+    """Start recording audio from the microphone.
+
+    With int16=True the recording is stored as 16-bit PCM, halving memory.
+    In persistent-stream mode the pre-roll is prepended and also passed to
+    the chunk listeners.
+    """
+    global _audio_stream, _capture, last_preroll_seconds
+    capture = CaptureBuffer(dtype=np.int16 if int16 else np.float32)
+    if _persistent and _audio_stream is not None:
+        with _capture_lock:
+            preroll = _preroll.take()
+            if len(preroll):
+                chunk = capture.append(preroll)
+                for listener in _chunk_listeners:
+                    listener(chunk)
+            _capture = capture
+        last_preroll_seconds = len(preroll) / SAMPLE_RATE
+        print(f"Recording... (+{last_preroll_seconds:.2f}s pre-roll)")
+        return
+
+    _capture = capture
+    _audio_stream = _open_stream()
+    last_preroll_seconds = 0.0
+    print(f"Recording... (device open {last_device_open_seconds * 1000:.0f} ms)")
+
+
+def stop_stream() -> None:
+    """Stop and close the audio stream if active (for cleanup on shutdown).
+
+    Also leaves persistent-stream mode and discards any unfinished recording.
+    """
+    global _audio_stream, _capture, _persistent, _preroll
+    stream, _audio_stream = _audio_stream, None
+    _persistent = False
+    try:
+        if stream is not None:
+            stream.stop()
+    finally:
+        if stream is not None:
+            stream.close()
+        with _capture_lock:
+            _capture = None
+            _preroll = None
 
 
 def record_audio_stop() -> np.ndarray:
-    """Stop recording and return the audio as a 1D float32 numpy array."""
-    global _audio_stream
-    if _audio_stream is not None:
-        _audio_stream.stop()
-        _audio_stream.close()
-        _audio_stream = None
+    """Stop recording and return the audio as a 1D float32 numpy array.
+
+    For float32 capture this is a zero-copy view of the capture buffer. In
+    persistent-stream mode the stream keeps running and refills the pre-roll.
+    """
+    global _audio_stream, _capture
+    if _persistent:
+        with _capture_lock:
+            capture, _capture = _capture, None
+    else:
+        if _audio_stream is not None:
+            _audio_stream.stop()
+            _audio_stream.close()
+            _audio_stream = None
+        capture, _capture = _capture, None
 
-    if not _audio_chunks:
+    if capture is None or not len(capture):
         return np.array([], dtype=np.float32)
 
-    audio = np.concatenate(_audio_chunks, axis=0).flatten()
+    with tracing.span("audio.finalize", samples=len(capture)):
+        audio = capture.snapshot()
     duration = len(audio) / SAMPLE_RATE
     print(f"Recorded {duration:.1f}s of audio")
     return audio
@@ -0,0 +1,219 @@
+"""Inference backends for Typeness.
+
+A backend owns the Whisper and LLM models and provides load, transcribe
+and generate (LLM post-processing) operations, so main(), the server,
+replay and bench do not depend on how the models are run:
+
+    backend = create_backend("onnx")
+    backend.load_whisper()
+    text = backend.transcribe(audio)
+
+Both shipped backends drive the models through transformers generate(),
+so they share decoding settings, prompt handling and text normalization
+and differ only in how the models are loaded:
+
+- "torch": PyTorch modules (CUDA float16 or CPU float32, optionally
+  compiled or int8-quantized)
+- "onnx": ONNX Runtime CPU sessions over Whisper encoder/decoder and
+  Qwen3 graphs exported with optimum; exports are kept in ONNX_EXPORT_DIR
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from typeness import postprocess, transcribe as whisper
+
+BACKENDS = ("torch", "onnx")
+
+ONNX_EXPORT_DIR = Path(__file__).resolve().parents[2] / ".cache" / "onnx"
+
+
+class Backend(ABC):
+    """Interface shared by all backends.
+
+    Subclasses implement load_whisper() / load_llm(), which set
+    asr_pipeline and processor, or llm_model and tokenizer. Whisper methods
+    may be used once load_whisper() has returned, LLM methods once
+    load_llm() has.
+    """
+
+    name = ""
+
+    def __init__(self) -> None:
+        self.asr_pipeline = None
+        self.processor = None
+        self.llm_model = None
+        self.tokenizer = None
+
+    @abstractmethod
+    def load_whisper(self) -> None:
+        """Load Whisper, setting asr_pipeline and processor."""
+
+    @abstractmethod
+    def load_llm(self) -> None:
+        """Load the LLM, setting llm_model and tokenizer."""
+
+    @abstractmethod
+    def model_bytes(self) -> dict:
+        """Memory held by the loaded model weights: {"whisper", "llm"}."""
+
+    @property
+    def sample_rate(self) -> int:
+        return self.processor.feature_extractor.sampling_rate
+
+    def warmup_whisper(self) -> dict:
+        return whisper.warmup_whisper(self.asr_pipeline, self.processor)
+
+    def warmup_llm(self) -> dict:
+        return postprocess.warmup_llm(self.llm_model, self.tokenizer)
+
+    def transcribe(self, audio: np.ndarray, *, chunked: bool = False) -> str:
+        return whisper.transcribe(self.asr_pipeline, self.processor, audio, chunked=chunked)
+
+    def transcribe_batch(self, audios: list[np.ndarray]) -> list[str]:
+        return whisper.transcribe_batch(self.asr_pipeline, self.processor, audios)
+
+    def extract_features(self, audio: np.ndarray) -> dict:
+        return whisper.extract_features(self.processor, audio)
+
+    def encode_features(self, features: list[dict]) -> list[np.ndarray]:
+        return whisper.encode_features(self.asr_pipeline, features)
+
+    def transcribe_features(self, features: list[dict],
+                            encoder_states: list[np.ndarray | None] | None = None) -> list[str]:
+        return whisper.transcribe_features(
+            self.asr_pipeline, self.processor, features, encoder_states
+        )
+
+    def process_text(self, text: str, *, speculative: bool = False,
+                     fast_path: bool = True, stats: dict | None = None,
+                     on_segment: Callable[[str], None] | None = None) -> str:
+        return postprocess.process_text(
+            self.llm_model, self.tokenizer, text,
+            speculative=speculative, fast_path=fast_path, stats=stats,
+            on_segment=on_segment,
+        )
+
+    def process_text_batch(self, texts: list[str], *, fast_path: bool = True) -> list[str]:
+        return postprocess.process_text_batch(
+            self.llm_model, self.tokenizer, texts, fast_path=fast_path
+        )
+
+
+class TorchBackend(Backend):
+    """PyTorch + transformers inference (see load_whisper() / load_llm())."""
+
+    name = "torch"
+
+    def __init__(self, *, compile: bool = False, quantize: str | None = None) -> None:
+        super().__init__()
+        if compile and quantize is not None:
+            raise ValueError("compile cannot be combined with quantize")
+        self._compile = compile
+        self._quantize = quantize
+
+    def load_whisper(self) -> None:
+        self.asr_pipeline, self.processor = whisper.load_whisper(
+            compile=self._compile, quantize=self._quantize
+        )
+
+    def load_llm(self) -> None:
+        self.llm_model, self.tokenizer = postprocess.load_llm(
+            compile=self._compile, quantize=self._quantize
+        )
+
+    def model_bytes(self) -> dict:
+        from typeness.quantize import model_size_bytes
+
+        return {
+            "whisper": model_size_bytes(self.asr_pipeline.model) if self.asr_pipeline else None,
+            "llm": model_size_bytes(self.llm_model) if self.llm_model else None,
+        }
+
+
+def _load_onnx(model_class, model_id: str):
+    """Load an exported ONNX model, exporting it on first use."""
+    export_dir = ONNX_EXPORT_DIR / model_id.replace("/", "--")
+    if (export_dir / "config.json").exists():
+        return model_class.from_pretrained(export_dir, provider="CPUExecutionProvider")
+    print(f"Exporting {model_id} to ONNX (first run only)...")
+    model = model_class.from_pretrained(model_id, export=True, provider="CPUExecutionProvider")
+    model.save_pretrained(export_dir)
+    return model
+
+
+def _onnx_bytes(model_id: str) -> int:
+    export_dir = ONNX_EXPORT_DIR / model_id.replace("/", "--")
+    return sum(p.stat().st_size for p in export_dir.glob("*.onnx*"))
+
+
+class OnnxBackend(Backend):
+    """ONNX Runtime CPU inference over graphs exported with optimum.
+
+    Requires the optional onnx extra (optimum[onnxruntime]). The LLM runs
+    without the system-prompt KV prefix cache, and per-step speculative
+    decoding statistics are not collected.
+    """
+
+    name = "onnx"
+
+    def __init__(self, *, compile: bool = False, quantize: str | None = None) -> None:
+        super().__init__()
+        if compile or quantize is not None:
+            raise ValueError("the onnx backend does not support compile or quantize")
+
+    @staticmethod
+    def _optimum():
+        try:
+            import optimum.onnxruntime
+        except ImportError as exc:
+            raise RuntimeError(
+                "The onnx backend needs optimum with ONNX Runtime: "
+                "uv pip install 'optimum[onnxruntime]'"
+            ) from exc
+        return optimum.onnxruntime
+
+    def load_whisper(self) -> None:
+        from transformers import AutoProcessor, pipeline
+
+        ort = self._optimum()
+        print(f"Loading Whisper model ({whisper.WHISPER_MODEL_ID}) with ONNX Runtime on cpu...")
+        model = _load_onnx(ort.ORTModelForSpeechSeq2Seq, whisper.WHISPER_MODEL_ID)
+        self.processor = AutoProcessor.from_pretrained(whisper.WHISPER_MODEL_ID)
+        self.asr_pipeline = pipeline(
+            "automatic-speech-recognition",
+            model=model,
+            tokenizer=self.processor.tokenizer,
+            feature_extractor=self.processor.feature_extractor,
+        )
+        print("Whisper model loaded.")
+
+    def load_llm(self) -> None:
+        from transformers import AutoTokenizer
+
+        ort = self._optimum()
+        print(f"Loading LLM model ({postprocess.LLM_MODEL_ID}) with ONNX Runtime on cpu...")
+        self.tokenizer = AutoTokenizer.from_pretrained(postprocess.LLM_MODEL_ID)
+        self.llm_model = _load_onnx(ort.ORTModelForCausalLM, postprocess.LLM_MODEL_ID)
+        print("LLM model loaded.")
+
+    def model_bytes(self) -> dict:
+        return {
+            "whisper": _onnx_bytes(whisper.WHISPER_MODEL_ID) if self.asr_pipeline else None,
+            "llm": _onnx_bytes(postprocess.LLM_MODEL_ID) if self.llm_model else None,
+        }
+
+
+def create_backend(name: str = "torch", **options) -> Backend:
+    """Instantiate the backend called name (one of BACKENDS), not yet loaded.
+
+    options (compile, quantize) are passed to the backend constructor.
+    """
+    if name == "torch":
+        return TorchBackend(**options)
+    if name == "onnx":
+        return OnnxBackend(**options)
+    raise ValueError(f"Unknown backend: {name}")
@@ -0,0 +1,401 @@
+"""Latency and throughput benchmark for Typeness.
+
+Runs the fixture audio through transcribe() and process_text() repeatedly
+and records per-stage latency percentiles, Whisper real-time factor, LLM
+prefill vs decode time and decode tokens per second, plus model load
+time and memory. Results can be compared against a stored baseline to
+catch performance regressions or to show the savings of e.g. --quantize.
+
+Usage:
+    uv run python -m typeness.bench
+    uv run python -m typeness.bench --iterations 10 --warmup 2
+    uv run python -m typeness.bench --tag short --no-fast-path
+    uv run python -m typeness.bench --baseline tests/fixtures/bench_baseline.json
+    uv run python -m typeness.bench --baseline tests/fixtures/bench_baseline.json --update-baseline
+    uv run python -m typeness.bench --quantize int8 --baseline tests/fixtures/bench_baseline.json
+    uv run python -m typeness.bench --backend torch --backend onnx
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Suppress transformers/HF Hub progress bars to keep output concise
+os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
+os.environ.setdefault("TRANSFORMERS_NO_TQDM", "1")
+
+from typeness import postprocess  # noqa: E402
+from typeness.backend import BACKENDS, create_backend  # noqa: E402
+from typeness.quantize import QUANTIZE_MODES  # noqa: E402
+from typeness.replay import FIXTURES_DIR, _case_audio, _load_wav, load_cases  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERCENTILES = (50, 95, 99)
+
+# Default allowed slowdown vs the baseline before a metric counts as a regression
+REGRESSION_THRESHOLD = 0.10
+
+# (metric path, direction): +1 if higher is worse, -1 if lower is worse
+_COMPARED_METRICS = (
+    (("whisper", "p50"), 1),
+    (("whisper", "p95"), 1),
+    (("llm", "p50"), 1),
+    (("llm", "p95"), 1),
+    (("total", "p50"), 1),
+    (("total", "p95"), 1),
+    (("rtf", "p50"), 1),
+    (("llm_prefill", "p50"), 1),
+    (("llm_decode", "p50"), 1),
+    (("tokens_per_second",), -1),
+    (("memory", "peak_rss_bytes"), 1),
+)
+
+# Metrics shown side by side with the baseline: (metric path, label, unit)
+_SAVINGS_METRICS = (
+    (("whisper", "p50"), "Whisper p50", "s"),
+    (("llm", "p50"), "LLM p50", "s"),
+    (("total", "p50"), "Total p50", "s"),
+    (("memory", "whisper_model_bytes"), "Whisper model", "MiB"),
+    (("memory", "llm_model_bytes"), "LLM model", "MiB"),
+    (("memory", "peak_rss_bytes"), "Peak RSS", "MiB"),
+)
+
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _metric(metrics, path):
+    for key in path:
+        metrics = metrics.get(key) if isinstance(metrics, dict) else None
+    return metrics
+
+
+def _summarize(values):
+    """Percentiles and mean of a latency sample, or None if empty."""
+    if not values:
+        return None
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 4) for p in PERCENTILES}
+    summary["mean"] = round(float(np.mean(values)), 4)
+    summary["n"] = len(values)
+    return summary
+
+
+def run_bench(cases, backend, *,
+              iterations=5, warmup=1, speculative=False, fast_path=True):
+    """Benchmark every case end to end on a loaded backend and return the metrics dict.
+
+    The first `warmup` passes over the cases are run but not measured.
+    """
+    audios = [(c["id"], _load_wav(_case_audio(c))) for c in cases]
+    sample_rate = backend.sample_rate
+
+    samples = {
+        "whisper": [], "llm": [], "total": [], "rtf": [],
+        "llm_prefill": [], "llm_decode": [],
+    }
+    new_tokens = 0
+    decode_seconds = 0.0
+    routes = {}
+
+    for i in range(warmup + iterations):
+        measured = i >= warmup
+        label = f"iteration {i - warmup + 1}/{iterations}" if measured else f"warm-up {i + 1}/{warmup}"
+        print(f"\n--- Bench {label} ---")
+        for cid, audio in audios:
+            start = time.time()
+            text = backend.transcribe(audio)
+            whisper_latency = time.time() - start
+
+            stats = {}
+            llm_start = time.time()
+            backend.process_text(
+                text,
+                speculative=speculative, fast_path=fast_path, stats=stats,
+            )
+            llm_latency = time.time() - llm_start
+            if not measured:
+                continue
+
+            samples["whisper"].append(whisper_latency)
+            samples["llm"].append(llm_latency)
+            samples["total"].append(whisper_latency + llm_latency)
+            samples["rtf"].append(whisper_latency / (len(audio) / sample_rate))
+            route = stats.get("route", "llm")
+            routes[route] = routes.get(route, 0) + 1
+            if "prefill_seconds" in stats:
+                samples["llm_prefill"].append(stats["prefill_seconds"])
+                samples["llm_decode"].append(stats["decode_seconds"])
+                new_tokens += stats["new_tokens"]
+                decode_seconds += stats["decode_seconds"]
+
+    metrics = {name: _summarize(values) for name, values in samples.items()}
+    metrics["tokens_per_second"] = (
+        round(new_tokens / decode_seconds, 2) if decode_seconds else None
+    )
+    metrics["routes"] = routes
+    return metrics
+
+
+def compare_to_baseline(metrics, baseline, threshold=REGRESSION_THRESHOLD):
+    """Compare metrics with a baseline's and return the list of regressions.
+
+    Each regression is a dict with the metric name, both values and the
+    relative change; metrics missing on either side are skipped.
+    """
+    regressions = []
+    for path, direction in _COMPARED_METRICS:
+        current, previous = _metric(metrics, path), _metric(baseline, path)
+        if current is None or previous is None or previous == 0:
+            continue
+        change = (current - previous) / previous
+        if change * direction > threshold:
+            regressions.append({
+                "metric": ".".join(path),
+                "baseline": previous,
+                "current": current,
+                "change": round(change, 4),
+            })
+    return regressions
+
+
+def _bench_backend(name, cases, args, *, measure_rss):
+    """Load backend `name`, benchmark it and return its metrics.
+
+    Peak RSS is process-wide, so it is only meaningful (measure_rss) when
+    a single backend is benchmarked.
+    """
+    backend = create_backend(name, compile=args.compile, quantize=args.quantize)
+    load_start = time.time()
+    backend.load_whisper()
+    backend.load_llm()
+    load_seconds = time.time() - load_start
+
+    metrics = run_bench(
+        cases, backend,
+        iterations=args.iterations, warmup=args.warmup,
+        speculative=args.speculative, fast_path=not args.no_fast_path,
+    )
+    model_bytes = backend.model_bytes()
+    metrics["load_seconds"] = round(load_seconds, 2)
+    metrics["memory"] = {
+        "whisper_model_bytes": model_bytes["whisper"],
+        "llm_model_bytes": model_bytes["llm"],
+        "peak_rss_bytes": _peak_rss_bytes() if measure_rss else None,
+    }
+    return metrics
+
+
+def _print_savings(metrics, baseline, label="vs Baseline"):
+    """Print latency and memory next to the baseline's, with the change."""
+    print(f"\n=== {label} ===")
+    for path, label, unit in _SAVINGS_METRICS:
+        current, previous = _metric(metrics, path), _metric(baseline, path)
+        if current is None or previous is None or previous == 0:
+            continue
+        scale = 2**20 if unit == "MiB" else 1
+        change = (current - previous) / previous
+        print(f"{label:<14}: {previous / scale:9.2f}{unit} -> {current / scale:9.2f}{unit} "
+              f"({change * 100:+.1f}%)")
+
+
+def _print_summary(metrics):
+    """Print the per-stage latency table."""
+    print("\n=== Bench Results ===")
+    for name, unit in (("whisper", "s"), ("llm", "s"), ("total", "s"),
+                       ("llm_prefill", "s"), ("llm_decode", "s"), ("rtf", "x")):
+        summary = metrics.get(name)
+        if summary is None:
+            continue
+        cells = " | ".join(f"p{p} {summary[f'p{p}']:.3f}{unit}" for p in PERCENTILES)
+        print(f"{name:<12}: {cells} (n={summary['n']})")
+    if metrics.get("tokens_per_second") is not None:
+        print(f"Decode speed: {metrics['tokens_per_second']:.1f} tokens/s")
+    if metrics.get("routes"):
+        print("Routes      : " + ", ".join(f"{k} {v}" for k, v in sorted(metrics["routes"].items())))
+    memory = metrics.get("memory") or {}
+    if memory.get("whisper_model_bytes") is not None:
+        line = (f"Models      : Whisper {memory['whisper_model_bytes'] / 2**20:.0f} MiB, "
+                f"LLM {memory['llm_model_bytes'] / 2**20:.0f} MiB")
+        if memory.get("peak_rss_bytes") is not None:
+            line += f", peak RSS {memory['peak_rss_bytes'] / 2**20:.0f} MiB"
+        print(line)
+    if metrics.get("load_seconds") is not None:
+        print(f"Load time   : {metrics['load_seconds']:.1f}s")
+
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(
+        description="Typeness latency and throughput benchmark"
+    )
+    parser.add_argument(
+        "--case",
+        default=None,
+        help="Benchmark a single case by ID (e.g. 20260215_084842)",
+    )
+    parser.add_argument(
+        "--tag",
+        default=None,
+        help="Filter cases by tag (e.g. short, long, technical)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=5,
+        help="Measured passes over the cases (default: 5)",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Unmeasured passes before timing starts (default: 1)",
+    )
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="Use prompt-lookup speculative decoding for the LLM",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Send every case through the LLM (disable the rule-based fast path)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        action="append",
+        default=None,
+        help="Inference engine to benchmark (default: torch); repeat to compare "
+             "backends side by side, the first being the reference",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile both models with a static KV cache (compiled during the warm-up iterations)",
+    )
+    parser.add_argument(
+        "--quantize",
+        choices=QUANTIZE_MODES,
+        default=None,
+        help="Load both models with dynamic int8 Linear layers (CPU only)",
+    )
+    parser.add_argument(
+        "--output",
+        default=str(FIXTURES_DIR / "bench_last.json"),
+        help="Result output path (default: tests/fixtures/bench_last.json)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Compare against this stored result and exit 1 on regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help=f"Relative change that counts as a regression (default: {REGRESSION_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write this run's result to --baseline instead of comparing",
+    )
+    args = parser.parse_args()
+    if args.iterations < 1:
+        parser.error("--iterations must be at least 1")
+    if args.warmup < 0:
+        parser.error("--warmup must not be negative")
+    if args.update_baseline and args.baseline is None:
+        parser.error("--update-baseline requires --baseline")
+    if args.compile and args.quantize is not None:
+        parser.error("--compile cannot be combined with --quantize")
+    backends = list(dict.fromkeys(args.backend or ["torch"]))
+    if "onnx" in backends and (args.compile or args.quantize is not None):
+        parser.error("--backend onnx cannot be combined with --compile or --quantize")
+
+    cases = load_cases(case_id=args.case, tag=args.tag)
+    if not cases:
+        print("No cases to benchmark.")
+        sys.exit(1)
+
+    by_backend = {}
+    for name in backends:
+        print(f"\n=== Backend: {name} ===")
+        by_backend[name] = _bench_backend(name, cases, args, measure_rss=len(backends) == 1)
+        # Free this backend's models before loading the next one; the LLM
+        # prefix cache would otherwise keep the torch model alive
+        postprocess.reset_prefix_cache()
+        gc.collect()
+    metrics = by_backend[backends[0]]
+    result = {
+        "run_timestamp": datetime.now().isoformat(timespec="seconds"),
+        "cases": len(cases),
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "speculative": args.speculative,
+        "fast_path": not args.no_fast_path,
+        "compile": args.compile,
+        "quantize": args.quantize,
+        "backend": backends[0],
+        "metrics": metrics,
+    }
+    if len(backends) > 1:
+        result["backends"] = by_backend
+
+    regressions = []
+    if args.baseline is not None and not args.update_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(metrics, baseline["metrics"], args.threshold)
+        result["baseline"] = args.baseline
+        result["regressions"] = regressions
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    for name, backend_metrics in by_backend.items():
+        if len(backends) > 1:
+            print(f"\n--- {name} ---")
+        _print_summary(backend_metrics)
+    for name in backends[1:]:
+        _print_savings(by_backend[name], metrics, label=f"{name} vs {backends[0]}")
+    if args.baseline is not None and not args.update_baseline:
+        _print_savings(metrics, baseline["metrics"])
+    print(f"\nResult saved to: {args.output}")
+    if args.update_baseline:
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline is not None:
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {args.baseline} "
+                  f"(threshold {args.threshold * 100:.0f}%):")
+            for r in regressions:
+                print(f"  {r['metric']:<20} {r['baseline']} -> {r['current']} "
+                      f"({r['change'] * 100:+.1f}%)")
+            sys.exit(1)
+        print(f"No regressions vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,767 @@
+"""Indexed capture store for Typeness.
+
+Keeps debug captures and regression fixtures in two files instead of two
+loose files per utterance:
+
+- index.sqlite: one row per capture (timestamp, durations, texts,
+  latencies, fixture expectations), indexed on timestamp, audio duration
+  and tags, with a full-text index over the texts
+- audio.pack: append-only concatenation of encoded audio (see
+  encode_audio()), read back through a memory map; compaction writes the
+  live audio to a new pack file (audio.<n>.pack) and switches the index
+  to it in one transaction
+
+A store may be used by several processes at once, e.g. the app's capture
+writer and this module's CLI. Appends and compaction hold SQLite's write
+lock, so they never interleave, and readers look up a capture's pack file
+and offset in a single query, so a concurrent compaction never shows them
+an offset into the wrong file.
+
+Queries return metadata only; audio is decoded per capture on demand, so
+listing or selecting among tens of thousands of captures never touches
+the audio. A capture becomes a fixture when it is promoted with its
+expected outputs; replay can then select fixtures by query (replay --store).
+
+Usage:
+    uv run python -m typeness.capture_store list --text 會議 --since 2026-03-01
+    uv run python -m typeness.capture_store promote 20260315_101500 --tag short
+    uv run python -m typeness.capture_store export 20260315_101500
+    uv run python -m typeness.capture_store import
+    uv run python -m typeness.capture_store compact
+"""
+
+import argparse
+import json
+import mmap
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import wave
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+STORE_DIR = Path(__file__).resolve().parents[2] / "debug"
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "tests" / "fixtures"
+INDEX_FILE = "index.sqlite"
+PACK_FILE = "audio.pack"
+# How long an append waits for a compaction in another process to finish
+_LOCK_TIMEOUT_SECONDS = 300.0
+
+CAPTURE_AUDIO_SUFFIX = ".pcmz"
+# Header of an encoded capture: magic, sample rate, sample count
+_AUDIO_MAGIC = b"TNZ1"
+_AUDIO_HEADER = struct.Struct("<4sII")
+
+# Compact the pack once deleted audio outweighs live audio and this much
+_COMPACT_MIN_DEAD_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    audio_seconds REAL NOT NULL,
+    duration_seconds REAL,
+    speech_seconds REAL,
+    vad_trimmed_seconds REAL,
+    whisper_text TEXT,
+    processed_text TEXT,
+    whisper_latency REAL,
+    llm_latency REAL,
+    audio_offset INTEGER NOT NULL,
+    audio_bytes INTEGER NOT NULL,
+    fixture TEXT
+);
+CREATE INDEX IF NOT EXISTS captures_timestamp ON captures(timestamp);
+CREATE INDEX IF NOT EXISTS captures_audio_seconds ON captures(audio_seconds);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    capture_id TEXT NOT NULL REFERENCES captures(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, capture_id)
+);
+"""
+
+# Metadata columns accepted by CaptureStore.add()
+_FIELDS = (
+    "duration_seconds", "speech_seconds", "vad_trimmed_seconds",
+    "whisper_text", "processed_text", "whisper_latency", "llm_latency",
+)
+
+
+def encode_audio(audio: np.ndarray, sample_rate: int) -> bytes:
+    """Encode float32 audio as delta-coded, zlib-compressed int16 PCM.
+
+    Quantization to int16 matches the WAV fixtures; the delta coding and
+    compression are lossless, so decode_audio() returns exactly what a
+    16-bit WAV would have held, in less space (most for quiet audio).
+    """
+    pcm16 = (audio * 32767).clip(-32768, 32767).astype(np.int16)
+    # Consecutive samples are close, so their differences compress well
+    # (int16 wraparound keeps this reversible)
+    delta = np.diff(pcm16, prepend=np.int16(0)).astype("<i2")
+    header = _AUDIO_HEADER.pack(_AUDIO_MAGIC, sample_rate, len(pcm16))
+    return header + zlib.compress(delta.tobytes(), 6)
+
+
+def _decode_pcm16(data: bytes) -> np.ndarray:
+    magic, _, n_samples = _AUDIO_HEADER.unpack_from(data)
+    if magic != _AUDIO_MAGIC:
+        raise ValueError("not an encoded Typeness capture")
+    delta = np.frombuffer(zlib.decompress(data[_AUDIO_HEADER.size:]), dtype="<i2")
+    if len(delta) != n_samples:
+        raise ValueError(f"truncated capture: {len(delta)} of {n_samples} samples")
+    return np.cumsum(delta, dtype=np.int16)
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """Decode encode_audio() output into a float32 array."""
+    return _decode_pcm16(data).astype(np.float32) / 32767.0
+
+
+def _encoded_seconds(data: bytes) -> float:
+    _, sample_rate, n_samples = _AUDIO_HEADER.unpack_from(data)
+    return n_samples / sample_rate
+
+
+@dataclass(frozen=True)
+class StoredAudio:
+    """A capture's audio in a store, usable wherever a fixture path is.
+
+    Picklable, so cases selected from a store can be sent to replay worker
+    processes; each process opens the store on first use.
+    """
+
+    directory: Path
+    capture_id: str
+
+    def read_bytes(self) -> bytes:
+        return open_store(self.directory).audio_bytes(self.capture_id)
+
+    def __str__(self) -> str:
+        return f"{self.directory}#{self.capture_id}"
+
+
+def _map_wav(path: Path) -> np.ndarray:
+    """Memory-map the samples of a 16-bit mono PCM WAV file."""
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono WAV")
+        n_samples = wf.getnframes()
+    with open(path, "rb") as f:
+        f.seek(12)  # RIFF header
+        while True:
+            chunk_id, size = struct.unpack("<4sI", f.read(8))
+            if chunk_id == b"data":
+                offset = f.tell()
+                break
+            f.seek(size + (size & 1), 1)
+    if n_samples == 0:
+        return np.zeros(0, dtype="<i2")
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(n_samples,))
+
+
+def load_audio(path) -> np.ndarray:
+    """Read fixture audio (int16 WAV, encoded .pcmz or StoredAudio) as float32.
+
+    WAV samples are memory-mapped and converted directly, without reading
+    the file into an intermediate buffer.
+    """
+    if isinstance(path, StoredAudio):
+        return decode_audio(path.read_bytes())
+    path = Path(path)
+    if path.suffix == CAPTURE_AUDIO_SUFFIX:
+        return decode_audio(path.read_bytes())
+    return _map_wav(path).astype(np.float32) / 32767.0
+
+
+def audio_duration(path) -> float:
+    """Return the duration of fixture audio in seconds (header or index only)."""
+    if isinstance(path, StoredAudio):
+        return open_store(path.directory).audio_seconds(path.capture_id)
+    path = Path(path)
+    if path.suffix == CAPTURE_AUDIO_SUFFIX:
+        with open(path, "rb") as f:
+            return _encoded_seconds(f.read(_AUDIO_HEADER.size))
+    with wave.open(str(path), "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def read_audio_bytes(path) -> bytes:
+    """Raw stored bytes of fixture audio (for content hashing)."""
+    return (path if isinstance(path, StoredAudio) else Path(path)).read_bytes()
+
+
+def _create_fts(db: sqlite3.Connection) -> bool:
+    """Create the full-text index; False if this SQLite lacks FTS5 trigram."""
+    try:
+        db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS captures_text USING fts5("
+            "id UNINDEXED, whisper_text, processed_text, tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+class CaptureStore:
+    """Append-only capture store in one directory (created if missing).
+
+    Safe to use from several threads and processes. Deleting captures only
+    removes their index rows; compact() rewrites the pack without their
+    audio.
+    """
+
+    def __init__(self, directory: Path = STORE_DIR) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.directory / INDEX_FILE, check_same_thread=False,
+                                   timeout=_LOCK_TIMEOUT_SECONDS)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._fts = _create_fts(self._db)
+        self._db.commit()
+        self._pack_path(self._pack_generation()).touch()
+        self._map: mmap.mmap | None = None
+        self._map_generation: int | None = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._unmap()
+            self._db.close()
+
+    def _unmap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _pack_path(self, generation: int) -> Path:
+        return self.directory / (PACK_FILE if generation == 0 else f"audio.{generation}.pack")
+
+    def _pack_generation(self) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'pack_generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _read(self, generation: int, offset: int, length: int) -> bytes:
+        # A pack only grows, so remap when a capture lies beyond the current
+        # mapping, or when a compaction has moved the audio to a new pack
+        if (self._map is None or generation != self._map_generation
+                or offset + length > len(self._map)):
+            self._unmap()
+            with open(self._pack_path(generation), "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_generation = generation
+        return self._map[offset:offset + length]
+
+    def _unique_id(self, base: str) -> str:
+        capture_id, n = base, 1
+        while self._db.execute("SELECT 1 FROM captures WHERE id = ?", (capture_id,)).fetchone():
+            n += 1
+            capture_id = f"{base}_{n}"
+        return capture_id
+
+    def add(self, audio: np.ndarray, sample_rate: int, *,
+            capture_id: str | None = None, timestamp: datetime | None = None,
+            tags=(), fixture: dict | None = None, **fields) -> str:
+        """Append a capture and return its ID.
+
+        capture_id defaults to the timestamp (default: now) as
+        YYYYmmdd_HHMMSS, with a numeric suffix if that ID is taken. fields
+        are metadata columns (duration_seconds, whisper_text, ...). A
+        fixture dict (expected outputs, description, notes) makes the
+        capture a regression fixture.
+        """
+        unknown = set(fields) - set(_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown capture fields: {', '.join(sorted(unknown))}")
+        ts = timestamp or datetime.now()
+        data = encode_audio(audio, sample_rate)
+        with self._lock:
+            # The write lock keeps a compaction in another process from
+            # rewriting the pack between the append and the insert
+            self._db.execute("BEGIN IMMEDIATE")
+            with self._db:
+                capture_id = self._unique_id(capture_id or ts.strftime("%Y%m%d_%H%M%S"))
+                with open(self._pack_path(self._pack_generation()), "ab") as f:
+                    offset = f.tell()
+                    f.write(data)
+                row = {
+                    "id": capture_id,
+                    "timestamp": ts.isoformat(timespec="seconds"),
+                    "audio_seconds": round(_encoded_seconds(data), 3),
+                    "audio_offset": offset,
+                    "audio_bytes": len(data),
+                    "fixture": json.dumps(fixture, ensure_ascii=False) if fixture else None,
+                    **{name: fields.get(name) for name in _FIELDS},
+                }
+                self._db.execute(
+                    f"INSERT INTO captures ({', '.join(row)}) "
+                    f"VALUES ({', '.join('?' * len(row))})",
+                    list(row.values()),
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO tags (capture_id, tag) VALUES (?, ?)",
+                    [(capture_id, tag) for tag in tags],
+                )
+                if self._fts:
+                    self._db.execute(
+                        "INSERT INTO captures_text (id, whisper_text, processed_text) "
+                        "VALUES (?, ?, ?)",
+                        (capture_id, row["whisper_text"], row["processed_text"]),
+                    )
+        return capture_id
+
+    def _where(self, capture_id, tag, text, since, until, min_seconds, max_seconds,
+               fixtures_only):
+        clauses, params = [], []
+        if capture_id is not None:
+            clauses.append("id = ?")
+            params.append(capture_id)
+        if tag is not None:
+            clauses.append("id IN (SELECT capture_id FROM tags WHERE tag = ?)")
+            params.append(tag)
+        if text:
+            if self._fts and len(text) >= 3:
+                clauses.append("id IN (SELECT id FROM captures_text WHERE captures_text MATCH ?)")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                # Trigram matching needs at least three characters
+                clauses.append("(instr(whisper_text, ?) > 0 OR instr(processed_text, ?) > 0)")
+                params += [text, text]
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if min_seconds is not None:
+            clauses.append("audio_seconds >= ?")
+            params.append(min_seconds)
+        if max_seconds is not None:
+            clauses.append("audio_seconds <= ?")
+            params.append(max_seconds)
+        if fixtures_only:
+            clauses.append("fixture IS NOT NULL")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, *, capture_id: str | None = None, tag: str | None = None,
+              text: str | None = None, since: str | None = None, until: str | None = None,
+              min_seconds: float | None = None, max_seconds: float | None = None,
+              fixtures_only: bool = False, limit: int | None = None,
+              newest_first: bool = False) -> list[dict]:
+        """Return metadata of matching captures (no audio), oldest first.
+
+        text matches a substring of the Whisper or processed text; since
+        and until compare against ISO timestamps (a date prefix such as
+        "2026-03-01" works); min/max_seconds bound the audio duration.
+        """
+        where, params = self._where(capture_id, tag, text, since, until,
+                                    min_seconds, max_seconds, fixtures_only)
+        order = "DESC" if newest_first else "ASC"
+        sql = f"SELECT * FROM captures{where} ORDER BY timestamp {order}, id {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = [dict(row) for row in self._db.execute(sql, params)]
+            tags = {}
+            for row in self._db.execute(
+                f"SELECT capture_id, tag FROM tags WHERE capture_id IN (SELECT id FROM ({sql}))",
+                params,
+            ):
+                tags.setdefault(row["capture_id"], []).append(row["tag"])
+        for row in rows:
+            row["tags"] = sorted(tags.get(row["id"], []))
+            row["fixture"] = json.loads(row["fixture"]) if row["fixture"] else None
+        return rows
+
+    def cases(self, **filters) -> list[dict]:
+        """Fixtures matching filters (see query()) in the replay case format."""
+        cases = []
+        for row in self.query(fixtures_only=True, **filters):
+            cases.append({
+                "id": row["id"],
+                "audio": StoredAudio(self.directory, row["id"]),
+                "tags": row["tags"],
+                **row["fixture"],
+            })
+        return cases
+
+    def audio_bytes(self, capture_id: str) -> bytes:
+        """Encoded audio of a capture (see decode_audio())."""
+        with self._lock:
+            while True:
+                # One query, so the offset and pack file come from the same
+                # snapshot even while another process compacts
+                row = self._db.execute(
+                    "SELECT audio_offset, audio_bytes, (SELECT value FROM meta "
+                    "WHERE key = 'pack_generation') AS generation FROM captures WHERE id = ?",
+                    (capture_id,),
+                ).fetchone()
+                if row is None:
+                    raise KeyError(capture_id)
+                generation = int(row["generation"] or 0)
+                try:
+                    return self._read(generation, row["audio_offset"], row["audio_bytes"])
+                except FileNotFoundError:
+                    # Compacted and deleted since the query; look it up again
+                    if generation == self._pack_generation():
+                        raise
+
+    def load_audio(self, capture_id: str) -> np.ndarray:
+        return decode_audio(self.audio_bytes(capture_id))
+
+    def audio_seconds(self, capture_id: str) -> float:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT audio_seconds FROM captures WHERE id = ?", (capture_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(capture_id)
+        return row["audio_seconds"]
+
+    def promote(self, capture_id: str, *, whisper_expected: str | None = None,
+                processed_expected: str | None = None, description: str = "",
+                tags=(), notes: str | None = None, **extra) -> dict:
+        """Turn a capture into a regression fixture and return the fixture.
+
+        The expected outputs default to what was captured, for when the
+        capture already shows the desired result. extra keys (e.g.
+        processed_acceptable) are stored with the fixture.
+        """
+        row = self.query(capture_id=capture_id)
+        if not row:
+            raise KeyError(capture_id)
+        row = row[0]
+        fixture = {
+            "description": description,
+            "whisper_expected": whisper_expected if whisper_expected is not None
+            else row["whisper_text"],
+            "processed_expected": processed_expected if processed_expected is not None
+            else row["processed_text"],
+            "notes": notes,
+            **extra,
+        }
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE captures SET fixture = ? WHERE id = ?",
+                (json.dumps(fixture, ensure_ascii=False), capture_id),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO tags (capture_id, tag) VALUES (?, ?)",
+                [(capture_id, tag) for tag in tags],
+            )
+        return fixture
+
+    def delete(self, capture_ids) -> int:
+        """Remove captures from the index; their audio is reclaimed by compact()."""
+        ids = [(capture_id,) for capture_id in capture_ids]
+        with self._lock, self._db:
+            deleted = self._db.executemany("DELETE FROM captures WHERE id = ?", ids).rowcount
+            if self._fts:
+                self._db.executemany("DELETE FROM captures_text WHERE id = ?", ids)
+        return deleted
+
+    def stats(self) -> dict:
+        """{"captures", "fixtures", "live_bytes", "pack_bytes"}."""
+        with self._lock:
+            count, fixtures, live = self._db.execute(
+                "SELECT COUNT(*), COUNT(fixture), COALESCE(SUM(audio_bytes), 0) FROM captures"
+            ).fetchone()
+        return {
+            "captures": count,
+            "fixtures": fixtures,
+            "live_bytes": live,
+            "pack_bytes": self._pack_path(self._pack_generation()).stat().st_size,
+        }
+
+    def apply_retention(self, max_bytes: float | None = None,
+                        max_age_seconds: float | None = None) -> int:
+        """Delete the oldest non-fixture captures beyond the size and age limits.
+
+        Fixtures are never deleted. Compacts the pack once deleted audio
+        outweighs the live audio. Returns the number of captures deleted.
+        """
+        doomed = []
+        with self._lock:
+            if max_age_seconds is not None:
+                cutoff = datetime.fromtimestamp(time.time() - max_age_seconds)
+                doomed += [row["id"] for row in self._db.execute(
+                    "SELECT id FROM captures WHERE fixture IS NULL AND timestamp < ?",
+                    (cutoff.isoformat(timespec="seconds"),),
+                )]
+            if max_bytes is not None:
+                total = self._db.execute(
+                    "SELECT COALESCE(SUM(audio_bytes), 0) FROM captures"
+                ).fetchone()[0]
+                doomed_set = set(doomed)
+                for row in self._db.execute(
+                    "SELECT id, audio_bytes FROM captures WHERE fixture IS NULL "
+                    "ORDER BY timestamp, id"
+                ):
+                    if total <= max_bytes:
+                        break
+                    total -= row["audio_bytes"]
+                    if row["id"] not in doomed_set:
+                        doomed.append(row["id"])
+        deleted = self.delete(doomed) if doomed else 0
+
+        stats = self.stats()
+        dead = stats["pack_bytes"] - stats["live_bytes"]
+        if dead > max(stats["live_bytes"], _COMPACT_MIN_DEAD_BYTES):
+            self.compact()
+        return deleted
+
+    def compact(self) -> int:
+        """Rewrite the live audio into a new pack; return the bytes reclaimed.
+
+        The new pack and its offsets become visible in one transaction, and
+        other processes move to it on their next read. The old pack is then
+        deleted, or left for a later compaction if another process still has
+        it mapped (Windows).
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            with self._db:
+                generation = self._pack_generation()
+                before = self._pack_path(generation).stat().st_size
+                rows = self._db.execute(
+                    "SELECT id, audio_offset, audio_bytes FROM captures ORDER BY audio_offset"
+                ).fetchall()
+                moves = []
+                new_path = self._pack_path(generation + 1)
+                with open(new_path, "wb") as out:
+                    for row in rows:
+                        moves.append((out.tell(), row["id"]))
+                        out.write(self._read(generation, row["audio_offset"], row["audio_bytes"]))
+                self._db.executemany(
+                    "UPDATE captures SET audio_offset = ? WHERE id = ?", moves
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('pack_generation', ?)",
+                    (str(generation + 1),),
+                )
+            self._unmap()
+            after = new_path.stat().st_size
+            for path in [self._pack_path(0), *self.directory.glob("audio.*.pack")]:
+                if path != new_path:
+                    try:
+                        path.unlink(missing_ok=True)
+                    except OSError:
+                        pass
+            return before - after
+
+    def import_capture(self, result_path: Path, *, fixture: dict | None = None,
+                       tags=()) -> str | None:
+        """Add a loose capture (<id>_result.json + audio file) under its own ID.
+
+        Returns the ID, or None if a capture with that ID is already stored.
+        """
+        metadata = json.loads(result_path.read_text(encoding="utf-8"))
+        capture_id = result_path.name.removesuffix("_result.json")
+        if self.query(capture_id=capture_id):
+            return None
+        audio_path = result_path.parent / metadata["audio_file"]
+        timestamp = datetime.fromisoformat(metadata["timestamp"])
+        self.add(
+            load_audio(audio_path), _sample_rate(audio_path),
+            capture_id=capture_id, timestamp=timestamp, tags=tags, fixture=fixture,
+            **{name: metadata.get(name) for name in _FIELDS},
+        )
+        return capture_id
+
+
+def _sample_rate(path: Path) -> int:
+    if path.suffix == CAPTURE_AUDIO_SUFFIX:
+        with open(path, "rb") as f:
+            return _AUDIO_HEADER.unpack(f.read(_AUDIO_HEADER.size))[1]
+    with wave.open(str(path), "rb") as wf:
+        return wf.getframerate()
+
+
+_stores: dict[Path, CaptureStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(directory: Path = STORE_DIR) -> CaptureStore:
+    """Return this process's shared CaptureStore for directory."""
+    directory = Path(directory).resolve()
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = CaptureStore(directory)
+        return store
+
+
+def _import_fixtures(store: CaptureStore, cases_file: Path) -> int:
+    """Import the fixtures listed in a cases.json with their expectations."""
+    imported = 0
+    cases = json.loads(cases_file.read_text(encoding="utf-8"))["cases"]
+    for case in cases:
+        if store.query(capture_id=case["id"]):
+            continue
+        audio_path = cases_file.parent / case["audio_file"]
+        fixture = {k: v for k, v in case.items() if k not in ("id", "audio_file", "tags")}
+        store.add(
+            load_audio(audio_path), _sample_rate(audio_path),
+            capture_id=case["id"], timestamp=datetime.fromtimestamp(audio_path.stat().st_mtime),
+            tags=case.get("tags", []), fixture=fixture,
+        )
+        imported += 1
+    return imported
+
+
+def export_fixture(store: CaptureStore, capture_id: str,
+                   cases_file: Path = FIXTURES_DIR / "cases.json") -> dict:
+    """Write a capture as <id>_audio.wav next to cases_file and list it there.
+
+    The case uses the capture's fixture (see CaptureStore.promote()), or the
+    captured texts as expectations if it was never promoted. An existing
+    case with the same ID is replaced; a missing cases_file is created.
+    Returns the case.
+    """
+    rows = store.query(capture_id=capture_id)
+    if not rows:
+        raise KeyError(capture_id)
+    row = rows[0]
+    fixture = row["fixture"] or {
+        "description": "",
+        "whisper_expected": row["whisper_text"],
+        "processed_expected": row["processed_text"],
+        "notes": None,
+    }
+    data = store.audio_bytes(capture_id)
+    audio_file = f"{capture_id}_audio.wav"
+    cases_file.parent.mkdir(parents=True, exist_ok=True)
+    # Stored audio is already 16-bit PCM, so the WAV holds the same samples
+    with wave.open(str(cases_file.parent / audio_file), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(_AUDIO_HEADER.unpack_from(data)[1])
+        wf.writeframes(_decode_pcm16(data).astype("<i2").tobytes())
+
+    case = {"id": capture_id, "audio_file": audio_file, **fixture, "tags": row["tags"]}
+    if cases_file.exists():
+        manifest = json.loads(cases_file.read_text(encoding="utf-8"))
+    else:
+        manifest = {"cases": []}
+    cases = [c for c in manifest["cases"] if c["id"] != capture_id]
+    manifest["cases"] = [*cases, case]
+    cases_file.write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    return case
+
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Typeness capture store")
+    parser.add_argument("--store", type=Path, default=STORE_DIR,
+                        help="Store directory (default: debug/)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="List captures matching a query")
+    list_parser.add_argument("--tag", default=None, help="Only captures with this tag")
+    list_parser.add_argument("--text", default=None,
+                             help="Substring of the Whisper or processed text")
+    list_parser.add_argument("--since", default=None, help="ISO date/time lower bound")
+    list_parser.add_argument("--until", default=None, help="ISO date/time upper bound")
+    list_parser.add_argument("--min-seconds", type=float, default=None,
+                             help="Minimum audio duration")
+    list_parser.add_argument("--max-seconds", type=float, default=None,
+                             help="Maximum audio duration")
+    list_parser.add_argument("--fixtures", action="store_true", help="Only fixtures")
+    list_parser.add_argument("--limit", type=int, default=50,
+                             help="Newest N matches (default: 50)")
+
+    promote_parser = commands.add_parser(
+        "promote", help="Make a capture a regression fixture"
+    )
+    promote_parser.add_argument("capture_id")
+    promote_parser.add_argument("--whisper-expected", default=None,
+                                help="Expected Whisper output (default: as captured)")
+    promote_parser.add_argument("--processed-expected", default=None,
+                                help="Expected LLM output (default: as captured)")
+    promote_parser.add_argument("--description", default="")
+    promote_parser.add_argument("--tag", action="append", default=[],
+                                help="Tag to add (repeatable)")
+
+    export_parser = commands.add_parser(
+        "export", help="Write a capture into tests/fixtures (WAV + cases.json entry)"
+    )
+    export_parser.add_argument("capture_id")
+    export_parser.add_argument("--cases", type=Path, default=FIXTURES_DIR / "cases.json",
+                               help="cases.json to add the case to; the WAV is written "
+                                    "next to it (default: tests/fixtures/cases.json)")
+
+    import_parser = commands.add_parser(
+        "import", help="Import loose debug captures and the fixtures in a cases.json"
+    )
+    import_parser.add_argument("--debug-dir", type=Path, default=STORE_DIR,
+                               help="Directory with *_result.json captures (default: debug/)")
+    import_parser.add_argument("--cases", type=Path, default=None,
+                               help="cases.json whose fixtures to import")
+
+    commands.add_parser("compact", help="Reclaim the space of deleted captures")
+    args = parser.parse_args()
+
+    store = CaptureStore(args.store)
+    if args.command == "list":
+        rows = store.query(
+            tag=args.tag, text=args.text, since=args.since, until=args.until,
+            min_seconds=args.min_seconds, max_seconds=args.max_seconds,
+            fixtures_only=args.fixtures, limit=args.limit, newest_first=True,
+        )
+        for row in reversed(rows):
+            marker = "F" if row["fixture"] else " "
+            tags = f" [{', '.join(row['tags'])}]" if row["tags"] else ""
+            print(f"{marker} {row['id']}  {row['audio_seconds']:6.1f}s{tags}  "
+                  f"{(row['whisper_text'] or '')[:50]}")
+        stats = store.stats()
+        print(f"\n{len(rows)} shown; {stats['captures']} captures "
+              f"({stats['fixtures']} fixtures), {stats['pack_bytes'] / 1024 / 1024:.1f} MB audio")
+    elif args.command == "promote":
+        try:
+            fixture = store.promote(
+                args.capture_id, whisper_expected=args.whisper_expected,
+                processed_expected=args.processed_expected,
+                description=args.description, tags=args.tag,
+            )
+        except KeyError:
+            parser.error(f"no capture {args.capture_id}")
+        print(json.dumps({"id": args.capture_id, **fixture}, ensure_ascii=False, indent=2))
+    elif args.command == "export":
+        try:
+            case = export_fixture(store, args.capture_id, args.cases)
+        except KeyError:
+            parser.error(f"no capture {args.capture_id}")
+        print(json.dumps(case, ensure_ascii=False, indent=2))
+        print(f"Exported to {args.cases.parent / case['audio_file']} and {args.cases}")
+    elif args.command == "import":
+        captures = 0
+        for result_path in sorted(args.debug_dir.glob("*_result.json")):
+            try:
+                if store.import_capture(result_path) is not None:
+                    captures += 1
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"Skipping {result_path.name}: {exc}")
+        fixtures = _import_fixtures(store, args.cases) if args.cases is not None else 0
+        print(f"Imported {captures} captures and {fixtures} fixtures into {args.store}")
+    elif args.command == "compact":
+        print(f"Reclaimed {store.compact() / 1024 / 1024:.1f} MB")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
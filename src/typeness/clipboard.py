@@ -9,6 +9,7 @@ import time
 import pyperclip
 from pynput.keyboard import Controller, Key
 
+from typeness import tracing
 
 _keyboard = Controller()
 
@@ -19,10 +20,12 @@ def paste_text(text: str) -> None:
     A short delay between clipboard write and key simulation ensures
     the clipboard content is ready before pasting.
     """
-    pyperclip.copy(text)
+    with tracing.span("paste.copy", chars=len(text)):
+        pyperclip.copy(text)
     time.sleep(0.02)
 
-    _keyboard.press(Key.ctrl)
-    _keyboard.press("v")
-    _keyboard.release("v")
-    _keyboard.release(Key.ctrl)
+    with tracing.span("paste.keys"):
+        _keyboard.press(Key.ctrl)
+        _keyboard.press("v")
+        _keyboard.release("v")
+        _keyboard.release(Key.ctrl)
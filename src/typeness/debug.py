@@ -1,19 +1,29 @@
 """Debug capture module for Typeness.
 
 Saves audio recordings and transcription results for reproducing issues.
+
+Captures go into the indexed capture store in debug/ (see
+typeness.capture_store) and are written by a background CaptureWriter so
+the hot path never waits on disk. Old captures are deleted once the store
+exceeds a size quota or an age limit; promoted fixtures are kept.
 """
 
-import json
-import os
-import wave
+import queue
+import threading
 from datetime import datetime
-from pathlib import Path
 
 import numpy as np
 
 from typeness.audio import SAMPLE_RATE
+from typeness.capture_store import STORE_DIR, CaptureStore, open_store
+
+DEBUG_DIR = STORE_DIR
 
-DEBUG_DIR = Path(__file__).resolve().parents[2] / "debug"
+# Captures waiting for the writer thread; further captures are dropped
+CAPTURE_QUEUE_SIZE = 8
+# Retention policy for debug/ (None disables a limit)
+DEBUG_MAX_MB = 1024.0
+DEBUG_MAX_AGE_DAYS = 30.0
 
 
 def save_capture(
@@ -23,40 +33,105 @@ def save_capture(
     rec_duration: float,
     whisper_latency: float,
     llm_latency: float,
-) -> None:
-    """Save audio and transcription results to the debug/ directory."""
-    try:
-        os.makedirs(DEBUG_DIR, exist_ok=True)
-
-        ts = datetime.now()
-        prefix = ts.strftime("%Y%m%d_%H%M%S")
-        wav_name = f"{prefix}_audio.wav"
-        json_name = f"{prefix}_result.json"
-        wav_path = DEBUG_DIR / wav_name
-        json_path = DEBUG_DIR / json_name
-
-        # Save WAV (convert float32 -> int16 PCM)
-        pcm16 = (audio * 32767).clip(-32768, 32767).astype(np.int16)
-        with wave.open(str(wav_path), "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # int16 = 2 bytes
-            wf.setframerate(SAMPLE_RATE)
-            wf.writeframes(pcm16.tobytes())
-
-        # Save JSON metadata
-        metadata = {
-            "timestamp": ts.isoformat(timespec="seconds"),
-            "audio_file": wav_name,
-            "duration_seconds": round(rec_duration, 2),
-            "whisper_text": whisper_text,
-            "processed_text": processed_text,
-            "whisper_latency": round(whisper_latency, 3),
-            "llm_latency": round(llm_latency, 3),
-        }
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+    *,
+    speech_duration: float | None = None,
+    trimmed_seconds: float = 0.0,
+    timestamp: datetime | None = None,
+    store: CaptureStore | None = None,
+) -> str | None:
+    """Save audio and transcription results to the capture store.
 
-        print(f"[Debug] Saved: {json_path}")
+    The audio is what Whisper received, i.e. after VAD trimming. timestamp
+    (default: now) names the capture; store defaults to the one in
+    debug/. Returns the capture ID, or None if saving failed.
+    """
+    try:
+        store = store or open_store(DEBUG_DIR)
+        capture_id = store.add(
+            audio, SAMPLE_RATE,
+            timestamp=timestamp,
+            duration_seconds=round(rec_duration, 2),
+            speech_seconds=round(speech_duration, 2) if speech_duration is not None else None,
+            vad_trimmed_seconds=round(trimmed_seconds, 2),
+            whisper_text=whisper_text,
+            processed_text=processed_text,
+            whisper_latency=round(whisper_latency, 3),
+            llm_latency=round(llm_latency, 3),
+        )
+        print(f"[Debug] Saved: {capture_id}")
+        return capture_id
 
     except Exception as exc:
         print(f"[Debug] Warning: failed to save capture — {exc}")
+        return None
+
+
+class CaptureWriter:
+    """Writes debug captures on a background thread and applies retention.
+
+    submit() never blocks: captures go through a bounded queue, and when
+    queue_size captures are already waiting the new one is dropped and
+    counted in dropped. After each write, the oldest captures are deleted
+    until the store holds at most max_mb of audio and nothing older than
+    max_age_days (see CaptureStore.apply_retention()).
+    """
+
+    def __init__(self, *, queue_size: int = CAPTURE_QUEUE_SIZE,
+                 max_mb: float | None = DEBUG_MAX_MB,
+                 max_age_days: float | None = DEBUG_MAX_AGE_DAYS) -> None:
+        self._captures: queue.Queue[dict | None] = queue.Queue(maxsize=queue_size)
+        self._max_bytes = max_mb * 1024 * 1024 if max_mb is not None else None
+        self._max_age = max_age_days * 86400 if max_age_days is not None else None
+        self._thread: threading.Thread | None = None
+        self.saved = 0
+        self.dropped = 0
+        self.deleted = 0
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: np.ndarray, whisper_text: str, processed_text: str,
+               rec_duration: float, whisper_latency: float, llm_latency: float,
+               **kwargs) -> bool:
+        """Queue a capture (same arguments as save_capture()).
+
+        Returns False if the queue was full and the capture was dropped.
+        """
+        capture = {
+            "args": (audio, whisper_text, processed_text,
+                     rec_duration, whisper_latency, llm_latency),
+            "kwargs": {"timestamp": datetime.now(), **kwargs},
+        }
+        try:
+            self._captures.put_nowait(capture)
+        except queue.Full:
+            self.dropped += 1
+            print(f"[Debug] Writer busy, capture dropped ({self.dropped} so far)")
+            return False
+        return True
+
+    def close(self) -> None:
+        """Write the captures still queued, then stop the writer thread."""
+        if self._thread is None:
+            return
+        self._captures.put(None)
+        self._thread.join()
+        self._thread = None
+        if self.dropped:
+            print(f"[Debug] {self.dropped} capture(s) dropped because the writer fell behind")
+
+    def _run(self) -> None:
+        store = open_store(DEBUG_DIR)
+        while True:
+            capture = self._captures.get()
+            if capture is None:
+                return
+            if save_capture(*capture["args"], store=store, **capture["kwargs"]) is None:
+                continue
+            self.saved += 1
+            try:
+                self.deleted += store.apply_retention(self._max_bytes, self._max_age)
+            except Exception as exc:
+                print(f"[Debug] Warning: retention failed — {exc}")
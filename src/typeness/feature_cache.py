@@ -0,0 +1,162 @@
+"""Whisper feature and encoder-state cache for the Typeness replay engine.
+
+Log-mel features, and optionally Whisper encoder states, are persisted as
+.npy files and memory-mapped back, so a replay that misses the result
+cache (e.g. after changing WHISPER_INITIAL_PROMPT or the generate kwargs)
+neither decodes the audio nor recomputes features, and with encoder
+states runs only the decoder.
+
+Files are keyed by a hash of the audio and stored under a directory named
+after the model ID and a digest of what produced them: the feature
+extractor config for features, plus the model config, dtype, backend and
+quantization for encoder states. Changing any of these selects a new
+directory, so stale entries are never read.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from typeness.capture_store import StoredAudio, load_audio, read_audio_bytes
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / ".cache" / "features"
+# Bump when extract_features() / encode_features() change what they compute
+FEATURES_VERSION = 1
+
+_HASHES_FILE = "audio_hashes.json"
+
+
+def _digest(value) -> str:
+    if not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(value).hexdigest()
+
+
+def _save(path: Path, array: np.ndarray) -> None:
+    # Write then rename, so a concurrent reader never maps a partial file
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, array)
+    tmp_path.replace(path)
+
+
+class FeatureCache:
+    """Memory-mapped Whisper features (and encoder states) per fixture audio.
+
+    With encoder=True, encoder states of single-window recordings are
+    cached too; long-form recordings are re-encoded per window by
+    generate(), so only their features are cached. quantize is part of the
+    encoder-state key. Picklable, so it can be handed to replay workers.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, *, encoder: bool = False,
+                 quantize: str | None = None) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.encoder = encoder
+        self.quantize = quantize
+        self._hashes: dict | None = None
+        self.hits = {"features": 0, "encoder": 0}
+        self.misses = {"features": 0, "encoder": 0}
+
+    def _audio_hash(self, audio_path) -> str:
+        """Content hash of fixture audio.
+
+        Hashes of files are remembered by path, size and mtime, so a warm
+        cache does not read the audio at all.
+        """
+        if isinstance(audio_path, StoredAudio):
+            return _digest(read_audio_bytes(audio_path))
+        if self._hashes is None:
+            try:
+                self._hashes = json.loads((self.cache_dir / _HASHES_FILE).read_text("utf-8"))
+            except (OSError, ValueError):
+                self._hashes = {}
+        stat = Path(audio_path).stat()
+        key = str(Path(audio_path).resolve())
+        entry = self._hashes.get(key)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        audio_hash = _digest(read_audio_bytes(audio_path))
+        self._hashes[key] = [stat.st_size, stat.st_mtime_ns, audio_hash]
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_dir / f"{_HASHES_FILE}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(self._hashes), encoding="utf-8")
+        tmp_path.replace(self.cache_dir / _HASHES_FILE)
+        return audio_hash
+
+    def _model_dir(self) -> Path:
+        from typeness.transcribe import WHISPER_MODEL_ID
+
+        return self.cache_dir / WHISPER_MODEL_ID.replace("/", "--")
+
+    def _features_dir(self, backend) -> Path:
+        config = backend.processor.feature_extractor.to_dict()
+        digest = _digest([FEATURES_VERSION, config])
+        return self._model_dir() / f"features-{digest[:16]}"
+
+    def _encoder_dir(self, backend) -> Path:
+        model = backend.asr_pipeline.model
+        digest = _digest([
+            FEATURES_VERSION,
+            backend.processor.feature_extractor.to_dict(),
+            model.config.to_dict(),
+            str(getattr(model, "dtype", "float32")),
+            backend.name,
+            self.quantize,
+        ])
+        return self._model_dir() / f"encoder-{digest[:16]}"
+
+    def features(self, backend, audio_path) -> dict:
+        """extract_features() output for audio_path, memory-mapped when cached."""
+        directory = self._features_dir(backend)
+        audio_hash = self._audio_hash(audio_path)
+        path = directory / f"{audio_hash}.npy"
+        mask_path = directory / f"{audio_hash}.mask.npy"
+        if path.exists():
+            self.hits["features"] += 1
+            return {
+                "input_features": np.load(path, mmap_mode="r"),
+                "attention_mask": np.load(mask_path, mmap_mode="r") if mask_path.exists() else None,
+            }
+        self.misses["features"] += 1
+        features = backend.extract_features(load_audio(audio_path))
+        directory.mkdir(parents=True, exist_ok=True)
+        # The mask goes first: features without their mask would look single-window
+        if features["attention_mask"] is not None:
+            _save(mask_path, features["attention_mask"])
+        _save(path, features["input_features"])
+        return features
+
+    def encoder_states(self, backend, audio_path, features: dict) -> np.ndarray | None:
+        """Cached encoder states for single-window features, else None.
+
+        Returns None when encoder caching is off or the recording is
+        long-form. On a miss the encoder is run and its output stored.
+        """
+        if not self.encoder or features["attention_mask"] is not None:
+            return None
+        directory = self._encoder_dir(backend)
+        path = directory / f"{self._audio_hash(audio_path)}.npy"
+        if path.exists():
+            self.hits["encoder"] += 1
+            return np.load(path, mmap_mode="r")
+        self.misses["encoder"] += 1
+        states = backend.encode_features([features])[0]
+        directory.mkdir(parents=True, exist_ok=True)
+        _save(path, states)
+        return states
+
+    def merge_counts(self, summary: dict) -> None:
+        """Add hit/miss counts reported by another process."""
+        for kind, counts in summary.items():
+            self.hits[kind] += counts["hits"]
+            self.misses[kind] += counts["misses"]
+
+    def summary(self) -> dict:
+        """Hit/miss counts per kind, as stored in the replay report."""
+        return {
+            kind: {"hits": self.hits[kind], "misses": self.misses[kind]}
+            for kind in self.hits
+        }
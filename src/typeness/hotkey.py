@@ -12,6 +12,8 @@ from pynput.keyboard import Key, KeyCode, Listener
 # Event types sent to the main thread
 EVENT_START_RECORDING = "start_recording"
 EVENT_STOP_RECORDING = "stop_recording"
+# Sent by the silence detector, not the hotkey
+EVENT_AUTO_STOP = "auto_stop"
 
 # Hotkey combination: Shift+Win+A
 _HOTKEY = {Key.shift, Key.cmd, KeyCode.from_char("a")}
@@ -26,7 +28,7 @@ class HotkeyListener:
 
     Defenses:
     - Ignores injected (synthetic) key events to avoid capturing our own Ctrl+V
-    - busy flag prevents starting new recording during processing
+    - busy flag prevents starting a new recording while the job queue is full
     """
 
     def __init__(self, event_queue: queue.Queue) -> None:
@@ -45,6 +47,10 @@ class HotkeyListener:
     def busy(self, value: bool) -> None:
         self._busy = value
 
+    def set_idle(self) -> None:
+        """Return to idle after a recording was stopped without the hotkey."""
+        self._recording = False
+
     def _on_press(self, key: Key | KeyCode, injected: bool) -> None:
         # Ignore synthetic (injected) key events
         if injected:
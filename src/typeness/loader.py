@@ -0,0 +1,125 @@
+"""Background model loading module for Typeness.
+
+Loads Whisper and the LLM of an inference backend concurrently on
+background threads so the hotkey listener and audio capture can go live
+immediately; consumers block on whisper()/llm() until the model they need
+is ready.
+"""
+
+import threading
+import time
+
+from typeness.backend import Backend
+
+
+class _LoadTask:
+    """One model load (plus optional warm-up) running on its own thread."""
+
+    def __init__(self, name: str, load_fn, warmup_fn=None) -> None:
+        self.name = name
+        self._load_fn = load_fn
+        self._warmup_fn = warmup_fn
+        self._done = threading.Event()
+        self.error: BaseException | None = None
+        self.started = 0.0
+        self.loaded = 0.0
+        self.finished = 0.0
+        self.warmup_stats: dict | None = None
+
+    def start(self) -> None:
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        self.started = time.time()
+        try:
+            self._load_fn()
+            self.loaded = time.time()
+            if self._warmup_fn is not None:
+                self.warmup_stats = self._warmup_fn()
+        except BaseException as exc:
+            self.error = exc
+            print(f"[startup] {self.name} failed to load: {exc}")
+        finally:
+            self.finished = time.time()
+            self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self) -> None:
+        self._done.wait()
+
+    def get(self) -> None:
+        self.wait()
+        if self.error is not None:
+            raise RuntimeError(f"{self.name} failed to load") from self.error
+
+
+class ModelLoader:
+    """Loads a backend's Whisper and LLM in parallel and prints a load timeline.
+
+    With warmup=True each model is warmed up on synthetic input after
+    loading. Warm-up time is reported separately from load time, next to
+    the first-request latency it saves.
+    """
+
+    def __init__(self, backend: Backend, *, warmup: bool = False) -> None:
+        self._origin = time.time()
+        self.backend = backend
+        self._whisper = _LoadTask(
+            "Whisper", backend.load_whisper, backend.warmup_whisper if warmup else None,
+        )
+        self._llm = _LoadTask(
+            "LLM", backend.load_llm, backend.warmup_llm if warmup else None,
+        )
+        self.ready_at: float | None = None
+
+    def start(self) -> None:
+        """Start both loads and a watcher that prints the timeline when done."""
+        self._origin = time.time()
+        self._whisper.start()
+        self._llm.start()
+        threading.Thread(target=self._report_when_ready, daemon=True).start()
+
+    def whisper(self) -> Backend:
+        """Return the backend once Whisper has loaded, waiting if needed."""
+        self._whisper.get()
+        return self.backend
+
+    def llm(self) -> Backend:
+        """Return the backend once the LLM has loaded, waiting if needed."""
+        self._llm.get()
+        return self.backend
+
+    @property
+    def whisper_ready(self) -> bool:
+        return self._whisper.done and self._whisper.error is None
+
+    @property
+    def ready(self) -> bool:
+        return self._whisper.done and self._llm.done
+
+    def wait(self) -> None:
+        """Block until both loads have finished (successfully or not)."""
+        self._whisper.wait()
+        self._llm.wait()
+
+    def _report_when_ready(self) -> None:
+        self.wait()
+        self.ready_at = time.time()
+        print(f"\n[startup] Model load timeline ({self.backend.name} backend):")
+        for task in (self._whisper, self._llm):
+            status = "failed" if task.error is not None else "ready"
+            print(f"  {task.name:<8}: {task.started - self._origin:5.1f}s -> "
+                  f"{task.finished - self._origin:5.1f}s "
+                  f"({task.finished - task.started:.1f}s, {status})")
+            stats = task.warmup_stats
+            if stats is not None:
+                print(f"  {'':<8}  load {task.loaded - task.started:.1f}s + "
+                      f"warm-up {stats['seconds']:.1f}s; first request "
+                      f"{stats['cold_seconds']:.2f}s cold -> {stats['warm_seconds']:.2f}s warm "
+                      f"(~{stats['cold_seconds'] - stats['warm_seconds']:.2f}s saved)")
+        sequential = sum(t.finished - t.started for t in (self._whisper, self._llm))
+        print(f"  All models ready after {self.ready_at - self._origin:.1f}s "
+              f"(sequential load would take ~{sequential:.1f}s)\n")
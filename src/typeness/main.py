@@ -1,43 +1,128 @@
 """Typeness main entry point.
 
-Event-driven loop: hotkey -> record -> transcribe -> process -> paste.
+Event-driven loop: hotkey -> record -> queue job; worker threads
+transcribe -> process -> paste (see typeness.pipeline).
 """
 
 import queue
 import signal
-import time
 
 import transformers
 
-from typeness.audio import MIN_RECORDING_SECONDS, SAMPLE_RATE, record_audio_start, record_audio_stop, stop_stream
-from typeness.clipboard import paste_text
-from typeness.debug import DEBUG_DIR, save_capture
-from typeness.hotkey import EVENT_START_RECORDING, EVENT_STOP_RECORDING, HotkeyListener
-from typeness.postprocess import load_llm, process_text
-from typeness.transcribe import load_whisper, transcribe
+from typeness import tracing
+from typeness.audio import (
+    MIN_RECORDING_SECONDS,
+    PREROLL_SECONDS,
+    SAMPLE_RATE,
+    add_chunk_listener,
+    record_audio_start,
+    record_audio_stop,
+    remove_chunk_listener,
+    start_persistent_stream,
+    stop_stream,
+)
+from typeness.backend import create_backend
+from typeness.debug import DEBUG_DIR, DEBUG_MAX_AGE_DAYS, DEBUG_MAX_MB
+from typeness.hotkey import (
+    EVENT_AUTO_STOP,
+    EVENT_START_RECORDING,
+    EVENT_STOP_RECORDING,
+    HotkeyListener,
+)
+from typeness.loader import ModelLoader
+from typeness.pipeline import MAX_QUEUE_DEPTH, JobPipeline
+from typeness.streaming import StreamingTranscriber
+from typeness.vad import SilenceDetector, speech_seconds, trim_silence
 
 # Suppress noisy warnings from transformers (duplicate logits-processor, invalid generation flags)
 transformers.logging.set_verbosity_error()
 
 
-def main(*, debug: bool = False):
-    """Event-driven main loop: hotkey -> record -> transcribe -> process -> paste."""
+def main(*, debug: bool = False, streaming: bool = False, speculative: bool = False,
+         fast_path: bool = True, queue_depth: int = MAX_QUEUE_DEPTH,
+         trace_path: str | None = None, metrics_port: int | None = None,
+         int16_capture: bool = False, persistent_stream: bool = False,
+         preroll_seconds: float = PREROLL_SECONDS, vad: bool = True,
+         auto_stop_seconds: float | None = None, chunked_long_audio: bool = False,
+         warmup: bool = False, compile: bool = False, quantize: str | None = None,
+         backend: str = "torch", stream_output: bool = False,
+         debug_max_mb: float | None = DEBUG_MAX_MB,
+         debug_max_age_days: float | None = DEBUG_MAX_AGE_DAYS):
+    """Event-driven main loop: hotkey -> record -> transcribe -> process -> paste.
+
+    Models load in the background; the hotkey works immediately and early
+    recordings wait in the JobPipeline until the models are ready. A new
+    recording can start while up to queue_depth earlier ones are still
+    being processed. Hot-path timing spans go to trace_path (JSONL) and/or
+    a Prometheus /metrics endpoint on metrics_port when given. With
+    int16_capture, recordings are buffered as 16-bit PCM. With
+    persistent_stream, the microphone stays open and each recording starts
+    with the preroll_seconds captured before the hotkey press. With vad,
+    silence is trimmed before Whisper and the minimum-length check uses
+    speech duration; auto_stop_seconds of silence after speech ends the
+    recording without the hotkey. With chunked_long_audio, recordings over
+    30 s are transcribed as a batch of silence-cut windows. With warmup,
+    both models run synthetic input after loading so the first dictation
+    is not slowed by cold caches; compile (which implies warmup) also
+    compiles them with a static KV cache. quantize="int8" loads both
+    models with int8 Linear layers for CPU-only hosts. backend selects
+    the inference engine (see typeness.backend). With stream_output, LLM
+    output is pasted sentence by sentence while it is being generated.
+    Debug captures are written in the background; the oldest are deleted
+    beyond debug_max_mb in total or debug_max_age_days of age.
+    """
     print("=== Typeness ===")
     if debug:
         print(f"Debug mode ON — captures saved to {DEBUG_DIR}/")
-    print("Loading models, please wait...\n")
-
-    asr_pipeline, processor = load_whisper()
-    llm_model, tokenizer = load_llm()
+    if streaming:
+        print("Streaming transcription ON — Whisper runs while you speak")
+    if speculative:
+        print("Speculative decoding ON — LLM drafts tokens from the transcript")
+    if stream_output:
+        print("Streaming output ON — sentences are pasted as the LLM finishes them")
+    if auto_stop_seconds is not None:
+        print(f"Auto-stop ON — recording ends after {auto_stop_seconds:.1f}s of silence")
+    if trace_path is not None or metrics_port is not None:
+        tracing.enable(trace_path, metrics_port)
+    print("Loading models in the background...\n")
+
+    models = ModelLoader(
+        create_backend(backend, compile=compile, quantize=quantize),
+        warmup=warmup or compile,
+    )
+    models.start()
+
+    pipeline = JobPipeline(
+        models,
+        debug=debug, speculative=speculative, fast_path=fast_path,
+        max_depth=queue_depth, chunked_long_audio=chunked_long_audio,
+        stream_output=stream_output,
+        debug_max_mb=debug_max_mb, debug_max_age_days=debug_max_age_days,
+    )
+    pipeline.start()
+
+    if persistent_stream:
+        start_persistent_stream(preroll_seconds)
 
     event_queue: queue.Queue[str] = queue.Queue()
     listener = HotkeyListener(event_queue)
     listener.start()
 
-    print("\nReady! Press Shift+Win+A to start/stop voice input.")
+    print("Ready! Press Shift+Win+A to start/stop voice input.")
+    print("Recordings made before the models finish loading are queued.")
     print("Press Ctrl+C to exit.\n")
 
     shutdown = False
+    recording = False
+    streamer: StreamingTranscriber | None = None
+    silence_listener = None
+
+    def _watch_silence(detector: SilenceDetector):
+        # Runs on the audio callback thread; fires EVENT_AUTO_STOP once
+        def _listener(chunk):
+            if not detector.triggered and detector.feed(chunk):
+                event_queue.put(EVENT_AUTO_STOP)
+        return _listener
 
     def _signal_handler(signum, frame):
         nonlocal shutdown
@@ -48,70 +133,81 @@ def main(*, debug: bool = False):
 
     try:
         while not shutdown:
+            # Refuse new recordings only while the job queue is full
+            listener.busy = pipeline.full()
             try:
                 event = event_queue.get(timeout=0.5)
             except queue.Empty:
                 continue
 
             if event == EVENT_START_RECORDING:
-                record_audio_start()
-
-            elif event == EVENT_STOP_RECORDING:
+                # Streaming needs Whisper right away; during warm-up the
+                # recording is transcribed as a whole once the model is ready
+                if streaming and models.whisper_ready:
+                    streamer = StreamingTranscriber(models.whisper())
+                    streamer.start()
+                    add_chunk_listener(streamer.feed)
+                if auto_stop_seconds is not None:
+                    silence_listener = _watch_silence(SilenceDetector(auto_stop_seconds))
+                    add_chunk_listener(silence_listener)
+                record_audio_start(int16=int16_capture)
+                recording = True
+
+            elif event in (EVENT_STOP_RECORDING, EVENT_AUTO_STOP):
+                # A hotkey press can race an auto-stop; only the first counts
+                if not recording:
+                    continue
+                recording = False
+                if event == EVENT_AUTO_STOP:
+                    listener.set_idle()
+                    print("Silence detected, stopping.")
                 # Stop recording
-                audio = record_audio_stop()
-                print("Processing...")
-
-                listener.busy = True
-                try:
-                    rec_duration = len(audio) / SAMPLE_RATE
-                    if rec_duration < MIN_RECORDING_SECONDS:
-                        print("Recording too short, skipping.\n")
-                        continue
-
-                    # Transcribe
-                    t0 = time.time()
-                    whisper_text = transcribe(asr_pipeline, processor, audio)
-                    whisper_elapsed = time.time() - t0
-
-                    if not whisper_text.strip():
-                        print("No speech detected, skipping.\n")
-                        continue
-
-                    # LLM post-processing
-                    t1 = time.time()
-                    processed_text = process_text(llm_model, tokenizer, whisper_text)
-                    llm_elapsed = time.time() - t1
-
-                    total_elapsed = whisper_elapsed + llm_elapsed
-
-                    # Auto-paste to focused window
-                    paste_text(processed_text)
-
-                    # Debug capture (after paste so it doesn't affect perceived latency)
-                    if debug:
-                        save_capture(
-                            audio, whisper_text, processed_text,
-                            rec_duration, whisper_elapsed, llm_elapsed,
-                        )
-
-                    # Display results
-                    print("\n" + "=" * 50)
-                    print("[Whisper raw]")
-                    print(whisper_text)
-                    print("-" * 50)
-                    print("[LLM processed]")
-                    print(processed_text)
-                    print("-" * 50)
-                    print(f"Recording duration : {rec_duration:.1f}s")
-                    print(f"Whisper latency    : {whisper_elapsed:.2f}s")
-                    print(f"LLM latency        : {llm_elapsed:.2f}s")
-                    print(f"Total latency      : {total_elapsed:.2f}s")
-                    print("=" * 50 + "\n")
-                finally:
-                    listener.busy = False
+                with tracing.span("audio.stop"):
+                    audio = record_audio_stop()
+                if silence_listener is not None:
+                    remove_chunk_listener(silence_listener)
+                    silence_listener = None
+                if streamer is not None:
+                    remove_chunk_listener(streamer.feed)
+                job_streamer, streamer = streamer, None
+
+                rec_duration = len(audio) / SAMPLE_RATE
+                speech_duration = None
+                trimmed_seconds = 0.0
+                if vad:
+                    with tracing.span("audio.vad", samples=len(audio)):
+                        speech_duration = speech_seconds(audio)
+                        # The streamer has already consumed the raw audio
+                        if job_streamer is None:
+                            trimmed = trim_silence(audio)
+                            trimmed_seconds = (len(audio) - len(trimmed)) / SAMPLE_RATE
+                            audio = trimmed
+                if (speech_duration if vad else rec_duration) < MIN_RECORDING_SECONDS:
+                    if job_streamer is not None:
+                        job_streamer.cancel()
+                    print("Recording too short, skipping.\n")
+                    continue
+
+                job = pipeline.submit(
+                    audio, rec_duration, job_streamer,
+                    speech_duration=speech_duration, trimmed_seconds=trimmed_seconds,
+                )
+                if job is None:
+                    if job_streamer is not None:
+                        job_streamer.cancel()
+                    print("Job queue full, recording dropped.\n")
+                    continue
+                print(f"Queued job {job.seq}, processing...")
 
     finally:
         print("\nShutting down...")
         stop_stream()
+        if silence_listener is not None:
+            remove_chunk_listener(silence_listener)
+        if streamer is not None:
+            remove_chunk_listener(streamer.feed)
+            streamer.cancel()
+        pipeline.stop()
         listener.stop()
+        tracing.disable()
         print("Bye!")
@@ -0,0 +1,310 @@
+"""Job pipeline module for Typeness.
+
+Runs transcription, LLM post-processing and paste on worker threads so a
+new recording can start while earlier ones are still being processed.
+
+Each stage has a single worker consuming a FIFO queue, so pastes come out
+in submission order.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from typeness import tracing
+from typeness.clipboard import paste_text
+from typeness.debug import DEBUG_MAX_AGE_DAYS, DEBUG_MAX_MB, CaptureWriter
+from typeness.loader import ModelLoader
+from typeness.streaming import StreamingTranscriber
+
+# Maximum number of jobs in flight (queued or being processed)
+MAX_QUEUE_DEPTH = 3
+# Jobs older than this (not counting model warm-up) are dropped instead of
+# pasted into whatever window the user has moved on to
+STALE_JOB_SECONDS = 60.0
+
+
+@dataclass
+class Job:
+    """One recording travelling through the pipeline."""
+
+    seq: int
+    audio: np.ndarray
+    rec_duration: float
+    streamer: StreamingTranscriber | None = None
+    speech_duration: float | None = None
+    trimmed_seconds: float = 0.0
+    submitted: float = field(default_factory=time.time)
+    cancelled: bool = False
+    whisper_text: str = ""
+    processed_text: str = ""
+    queue_wait: float = 0.0
+    whisper_elapsed: float = 0.0
+    llm_elapsed: float = 0.0
+    paste_elapsed: float = 0.0
+    first_paste_elapsed: float | None = None
+    llm_stats: dict = field(default_factory=dict)
+    # Streamed LLM output (stream_output): completed pieces, then None
+    segments: queue.Queue[str | None] | None = None
+
+
+class JobPipeline:
+    """Three-stage worker pipeline: transcribe -> LLM -> paste.
+
+    Models come from a ModelLoader; stages block until the model they need
+    has loaded, so jobs submitted during warm-up simply wait in the queue.
+    submit() refuses new jobs once max_depth jobs are in flight. Jobs that
+    were cancelled, or that have been waiting longer than stale_seconds
+    since the models became ready, are dropped at the next stage boundary.
+
+    With stream_output, a job is handed to the paste stage as soon as LLM
+    generation starts, and each completed sentence or line is pasted while
+    the rest is still being generated.
+    """
+
+    def __init__(self, models: ModelLoader, *,
+                 debug: bool = False, speculative: bool = False,
+                 fast_path: bool = True, max_depth: int = MAX_QUEUE_DEPTH,
+                 stale_seconds: float = STALE_JOB_SECONDS,
+                 chunked_long_audio: bool = False,
+                 stream_output: bool = False,
+                 debug_max_mb: float | None = DEBUG_MAX_MB,
+                 debug_max_age_days: float | None = DEBUG_MAX_AGE_DAYS) -> None:
+        self._models = models
+        self._captures = (
+            CaptureWriter(max_mb=debug_max_mb, max_age_days=debug_max_age_days)
+            if debug else None
+        )
+        self._chunked = chunked_long_audio
+        self._speculative = speculative
+        self._stream_output = stream_output
+        self._fast_path = fast_path
+        self._max_depth = max_depth
+        self._stale_seconds = stale_seconds
+
+        self._lock = threading.Lock()
+        self._in_flight: list[Job] = []
+        self._next_seq = 1
+        self._transcribe_queue: queue.Queue[Job | None] = queue.Queue()
+        self._llm_queue: queue.Queue[Job | None] = queue.Queue()
+        self._paste_queue: queue.Queue[Job | None] = queue.Queue()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start one worker thread per stage (and the debug capture writer)."""
+        if self._captures is not None:
+            self._captures.start()
+        stages = [
+            (self._transcribe_queue, self._transcribe_stage),
+            (self._llm_queue, self._llm_stage),
+            (self._paste_queue, self._paste_stage),
+        ]
+        for jobs, stage in stages:
+            thread = threading.Thread(target=self._worker, args=(jobs, stage), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Cancel pending jobs and wait for the workers to exit."""
+        self.cancel_pending()
+        for jobs in (self._transcribe_queue, self._llm_queue, self._paste_queue):
+            jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+        if self._captures is not None:
+            self._captures.close()
+
+    def full(self) -> bool:
+        """True if no more jobs can be accepted right now."""
+        with self._lock:
+            return len(self._in_flight) >= self._max_depth
+
+    def submit(self, audio: np.ndarray, rec_duration: float,
+               streamer: StreamingTranscriber | None = None, *,
+               speech_duration: float | None = None,
+               trimmed_seconds: float = 0.0) -> Job | None:
+        """Queue a recording for processing. Return None if the queue is full."""
+        with self._lock:
+            if len(self._in_flight) >= self._max_depth:
+                return None
+            job = Job(self._next_seq, audio, rec_duration, streamer,
+                      speech_duration=speech_duration, trimmed_seconds=trimmed_seconds)
+            self._next_seq += 1
+            self._in_flight.append(job)
+        self._transcribe_queue.put(job)
+        return job
+
+    def cancel_pending(self) -> None:
+        """Mark every in-flight job as cancelled."""
+        with self._lock:
+            for job in self._in_flight:
+                job.cancelled = True
+
+    def _finish(self, job: Job) -> None:
+        with self._lock:
+            if job in self._in_flight:
+                self._in_flight.remove(job)
+
+    def _drop(self, job: Job, reason: str) -> None:
+        if job.streamer is not None:
+            job.streamer.cancel()
+        print(f"[Job {job.seq}] {reason}, skipping.\n")
+        self._finish(job)
+
+    def _worker(self, jobs: queue.Queue, stage) -> None:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                self._drop(job, "Cancelled")
+                continue
+            # Time spent waiting for models to load does not make a job stale
+            waiting_since = max(job.submitted, self._models.ready_at or time.time())
+            if time.time() - waiting_since > self._stale_seconds:
+                self._drop(job, "Stale")
+                continue
+            try:
+                stage(job)
+            except Exception as exc:
+                self._drop(job, f"Failed ({exc})")
+
+    def _transcribe_stage(self, job: Job) -> None:
+        backend = self._models.whisper()
+        job.queue_wait = time.time() - job.submitted
+        tracing.record("job.queue_wait", job.queue_wait, job=job.seq)
+        t0 = time.time()
+        with tracing.span("job.transcribe", job=job.seq, streaming=job.streamer is not None):
+            if job.streamer is not None:
+                # Streaming: only the tail after the last committed window
+                job.whisper_text = job.streamer.finish()
+            else:
+                job.whisper_text = backend.transcribe(job.audio, chunked=self._chunked)
+        job.whisper_elapsed = time.time() - t0
+
+        if not job.whisper_text.strip():
+            self._drop(job, "No speech detected")
+            return
+        self._llm_queue.put(job)
+
+    def _llm_stage(self, job: Job) -> None:
+        backend = self._models.llm()
+        if self._stream_output:
+            job.segments = queue.Queue()
+            self._paste_queue.put(job)
+        t0 = time.time()
+        try:
+            with tracing.span("job.llm", job=job.seq, streamed=self._stream_output):
+                job.processed_text = backend.process_text(
+                    job.whisper_text,
+                    speculative=self._speculative, fast_path=self._fast_path,
+                    stats=job.llm_stats,
+                    on_segment=job.segments.put if job.segments is not None else None,
+                )
+        except Exception as exc:
+            if job.segments is None:
+                raise
+            # The paste stage already holds this job: drop it here, before
+            # the end of the stream wakes the paste stage, and only then make
+            # it stop pasting, so it finds the job no longer in flight
+            self._drop(job, f"Failed ({exc})")
+            job.cancelled = True
+            return
+        finally:
+            if job.segments is not None:
+                job.segments.put(None)
+        job.llm_elapsed = time.time() - t0
+        if job.segments is None:
+            self._paste_queue.put(job)
+
+    def _paste_segments(self, job: Job) -> None:
+        """Paste streamed pieces as they arrive, until the LLM stage ends."""
+        while True:
+            segment = job.segments.get()
+            if segment is None or job.cancelled:
+                return
+            t0 = time.time()
+            paste_text(segment)
+            job.paste_elapsed += time.time() - t0
+            if job.first_paste_elapsed is None:
+                job.first_paste_elapsed = time.time() - job.submitted
+
+    def _paste_stage(self, job: Job) -> None:
+        with tracing.span("job.paste", job=job.seq, streamed=job.segments is not None):
+            if job.segments is not None:
+                self._paste_segments(job)
+            else:
+                t0 = time.time()
+                paste_text(job.processed_text)
+                job.paste_elapsed = time.time() - t0
+                job.first_paste_elapsed = time.time() - job.submitted
+        if job.cancelled:
+            with self._lock:
+                pending = job in self._in_flight
+            # A failed streamed LLM stage has already dropped the job
+            if pending:
+                self._drop(job, "Cancelled")
+            return
+        if job.first_paste_elapsed is not None:
+            tracing.record("job.first_paste", job.first_paste_elapsed, job=job.seq)
+        total_elapsed = time.time() - job.submitted
+        tracing.record("job.total", total_elapsed, job=job.seq,
+                       audio_seconds=round(job.rec_duration, 3))
+        self._finish(job)
+
+        # Debug capture (after paste, and written on the capture writer's
+        # thread, so it doesn't affect perceived latency)
+        if self._captures is not None:
+            self._captures.submit(
+                job.audio, job.whisper_text, job.processed_text,
+                job.rec_duration, job.whisper_elapsed, job.llm_elapsed,
+                speech_duration=job.speech_duration,
+                trimmed_seconds=job.trimmed_seconds,
+            )
+
+        print(_format_job_report(job, total_elapsed))
+
+
+def _format_job_report(job: Job, total_elapsed: float) -> str:
+    """Build the per-job results block printed after paste."""
+    lines = [
+        "",
+        "=" * 50,
+        f"[Job {job.seq}] [Whisper raw]",
+        job.whisper_text,
+        "-" * 50,
+        "[LLM processed]",
+        job.processed_text,
+        "-" * 50,
+        f"Recording duration : {job.rec_duration:.1f}s",
+    ]
+    if job.speech_duration is not None:
+        lines.append(f"Speech duration    : {job.speech_duration:.1f}s "
+                     f"({job.trimmed_seconds:.1f}s silence trimmed)")
+    lines += [
+        f"Queue wait         : {job.queue_wait:.2f}s",
+        f"Whisper latency    : {job.whisper_elapsed:.2f}s",
+    ]
+    if job.streamer is not None:
+        lines.append(f"Streamed windows   : {job.streamer.windows} "
+                     f"({job.streamer.background_seconds:.2f}s in background)")
+    lines.append(f"LLM latency        : {job.llm_elapsed:.2f}s")
+    stats = job.llm_stats
+    if stats.get("route") == "rule":
+        saved = stats.get("llm_seconds_saved")
+        note = f" (~{saved:.2f}s saved)" if saved is not None else ""
+        lines.append(f"LLM route          : fast path{note}")
+    if "acceptance_rate" in stats:
+        tokens_per_step = stats["new_tokens"] / stats["decode_steps"]
+        lines.append(f"LLM draft accepted : {stats['acceptance_rate'] * 100:.0f}% "
+                     f"({tokens_per_step:.1f} tokens/step)")
+    lines.append(f"Paste latency      : {job.paste_elapsed:.2f}s")
+    if job.segments is not None and job.first_paste_elapsed is not None:
+        lines.append(f"First paste latency: {job.first_paste_elapsed:.2f}s")
+    lines.append(f"Total latency      : {total_elapsed:.2f}s")
+    lines.append("=" * 50 + "\n")
+    return "\n".join(lines)
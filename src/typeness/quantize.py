@@ -0,0 +1,58 @@
+"""Reduced-precision CPU inference for Typeness.
+
+Dynamic int8 quantization of the Linear layers of Whisper and Qwen3: the
+weights are stored as int8 and activations are quantized on the fly, which
+cuts Linear weight memory to a quarter of float32 and uses the int8 CPU
+matmul kernels. Embeddings and layer norms stay in float32. Only applies
+to models on the CPU; CUDA loads keep float16.
+"""
+
+import time
+
+import torch
+
+QUANTIZE_MODES = ("int8",)
+
+
+def _tensor_bytes(value, seen: set) -> int:
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v, seen) for v in value)
+    if not isinstance(value, torch.Tensor):
+        return 0
+    # Tied weights (e.g. lm_head / embed_tokens) appear under several keys
+    ptr = value.data_ptr()
+    if ptr in seen:
+        return 0
+    seen.add(ptr)
+    return value.nelement() * value.element_size()
+
+
+def model_size_bytes(model) -> int:
+    """Bytes held by a model's parameters and buffers, quantized or not."""
+    seen: set = set()
+    return sum(_tensor_bytes(value, seen) for value in model.state_dict().values())
+
+
+def quantize_model(model, mode: str | None):
+    """Quantize model in place according to mode and return it.
+
+    mode is None (no-op) or one of QUANTIZE_MODES.
+    """
+    if mode is None:
+        return model
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    if model.device.type != "cpu":
+        print(f"{mode} quantization is CPU-only; keeping {model.dtype} on {model.device}")
+        return model
+
+    start = time.time()
+    before = model_size_bytes(model)
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    after = model_size_bytes(model)
+    elapsed = time.time() - start
+    print(f"Quantized Linear layers to {mode} "
+          f"({before / 2**20:.0f} -> {after / 2**20:.0f} MiB, {elapsed:.1f}s)")
+    return model
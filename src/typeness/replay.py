@@ -7,31 +7,67 @@ Usage:
     uv run python -m typeness.replay --stage llm
     uv run python -m typeness.replay --stage whisper
     uv run python -m typeness.replay --stage full
+    uv run python -m typeness.replay --stage whisper --streaming
+    uv run python -m typeness.replay --stage whisper --compare-long-form
+    uv run python -m typeness.replay --stage llm --batch-size 8 --verify-batch
+    uv run python -m typeness.replay --stage full --batch-size 8
     uv run python -m typeness.replay --case 20260215_084842 --stage llm
     uv run python -m typeness.replay --tag short --stage llm
+    uv run python -m typeness.replay --stage full --no-cache
+    uv run python -m typeness.replay --stage full --workers 4
+    uv run python -m typeness.replay --stage full --quantize int8 --compare-to tests/fixtures/float_run.json
+    uv run python -m typeness.replay --stage full --backend onnx --compare-to tests/fixtures/torch_run.json
+    uv run python -m typeness.replay --stage llm --store --tag short --since 2026-03-01
+    uv run python -m typeness.replay --stage whisper --no-cache --encoder-cache
 """
 
 import argparse
+import heapq
 import json
+import multiprocessing
 import os
+import queue
 import sys
+import threading
 import time
-import wave
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from pathlib import Path
 
-import numpy as np
+from typeness.backend import BACKENDS
+from typeness.capture_store import (
+    FIXTURES_DIR,
+    STORE_DIR,
+    audio_duration,
+    load_audio,
+    open_store,
+)
+from typeness.quantize import QUANTIZE_MODES
+from typeness.scoring import score
 
 # Suppress transformers/HF Hub progress bars to keep output concise
 os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
 os.environ.setdefault("TRANSFORMERS_NO_TQDM", "1")
 
-FIXTURES_DIR = Path(__file__).resolve().parents[2] / "tests" / "fixtures"
 CASES_FILE = FIXTURES_DIR / "cases.json"
 
+# Size of the simulated microphone callback blocks for --streaming
+STREAM_CHUNK_SECONDS = 0.1
+
+# Batches of decoded + feature-extracted audio the prefetch worker may run ahead
+PREFETCH_BATCHES = 2
+
+
+def load_cases(case_id=None, tag=None, store=None, **query):
+    """Load test cases from cases.json, optionally filtering by ID or tag.
+
+    With store (a capture store directory), cases are instead the fixtures
+    in that store matching case_id, tag and query (text, since, until,
+    min_seconds, max_seconds; see CaptureStore.query()); only the index
+    is read.
+    """
+    if store is not None:
+        return open_store(store).cases(capture_id=case_id, tag=tag, **query)
 
-def load_cases(case_id=None, tag=None):
-    """Load test cases from cases.json, optionally filtering by ID or tag."""
     if not CASES_FILE.exists():
         print(f"No cases.json found at {CASES_FILE}")
         print("Copy cases.example.json to cases.json and add your test cases.")
@@ -51,100 +87,393 @@ def load_cases(case_id=None, tag=None):
     return cases
 
 
+def _case_audio(case):
+    """Audio of a case: a fixture WAV path, or StoredAudio for store cases."""
+    if "audio" in case:
+        return case["audio"]
+    return FIXTURES_DIR / case["audio_file"]
+
+
 def _load_wav(audio_path):
-    """Read a WAV file and return float32 numpy array (inverse of debug save)."""
-    with wave.open(str(audio_path), "rb") as wf:
-        raw = wf.readframes(wf.getnframes())
-        int16_data = np.frombuffer(raw, dtype=np.int16)
-        return int16_data.astype(np.float32) / 32767.0
+    """Read a WAV file (or stored capture) as a float32 numpy array."""
+    return load_audio(audio_path)
+
+
+def _wav_duration(audio_path):
+    """Return the duration of a WAV file or stored capture in seconds (header only)."""
+    return audio_duration(audio_path)
 
 
-def replay_whisper(asr_pipeline, processor, audio_path):
-    """Replay a WAV file through Whisper and return (text, latency)."""
-    from typeness.transcribe import transcribe
+def replay_whisper(backend, audio_path, chunked=False, feature_cache=None):
+    """Replay a WAV file through Whisper and return (text, latency).
+
+    With a feature_cache (FeatureCache), log-mel features, and encoder
+    states if it caches them, come from the cache (computed on a miss) and
+    only generate() runs; chunked long recordings still take the audio path.
+    """
+    if feature_cache is not None and not (chunked and _is_long(audio_path)):
+        features = feature_cache.features(backend, audio_path)
+        start = time.time()
+        states = feature_cache.encoder_states(backend, audio_path, features)
+        text = backend.transcribe_features([features], [states])[0]
+        return text, time.time() - start
 
     audio = _load_wav(audio_path)
     start = time.time()
-    text = transcribe(asr_pipeline, processor, audio)
+    text = backend.transcribe(audio, chunked=chunked)
     latency = time.time() - start
     return text, latency
 
 
-def replay_llm(llm_model, tokenizer, whisper_text):
-    """Replay text through LLM post-processing and return (text, latency)."""
-    from typeness.postprocess import process_text
+def _whisper_decode_path(audio_path, batch_size=1, chunked=False, feature_cache=None):
+    """Which WHISPER_DECODE_PATHS entry run_all_cases() uses for a recording."""
+    if chunked and _is_long(audio_path):
+        # transcribe_long() per case, with or without batching or a feature cache
+        return "pipeline"
+    encoder = (feature_cache is not None and feature_cache.encoder
+               and not _is_long(audio_path))
+    if batch_size > 1:
+        return "batched-encoder" if encoder else "batched"
+    if feature_cache is None:
+        return "pipeline"
+    return "encoder" if encoder else "features"
+
+
+def replay_whisper_batched(backend, audio_paths, batch_size, feature_cache=None):
+    """Replay WAV files through Whisper in batches.
+
+    A prefetch thread decodes the WAVs and computes log-mel features ahead
+    of the model, so generate() never waits on I/O. With a feature_cache,
+    features (and encoder states) come from the cache instead. Returns a
+    list of (text, latency) in input order, where latency is the batch's
+    model time divided evenly among its cases.
+    """
+    prefetched = queue.Queue(maxsize=PREFETCH_BATCHES * batch_size)
+
+    def _prefetch():
+        try:
+            for i, path in enumerate(audio_paths):
+                if feature_cache is not None:
+                    features = feature_cache.features(backend, path)
+                else:
+                    features = backend.extract_features(_load_wav(path))
+                prefetched.put((i, features))
+        except BaseException as exc:
+            # Handed to the consuming loop below, which re-raises it
+            prefetched.put(exc)
+        finally:
+            prefetched.put(None)
+
+    threading.Thread(target=_prefetch, daemon=True).start()
+
+    outputs = [None] * len(audio_paths)
+    pending = []
+
+    def _flush():
+        start = time.time()
+        states = None
+        if feature_cache is not None:
+            states = [feature_cache.encoder_states(backend, audio_paths[i], f)
+                      for i, f in pending]
+        texts = backend.transcribe_features([f for _, f in pending], states)
+        latency = (time.time() - start) / len(pending)
+        for (i, _), text in zip(pending, texts):
+            outputs[i] = (text, latency)
+        pending.clear()
+
+    while (item := prefetched.get()) is not None:
+        if isinstance(item, BaseException):
+            raise item
+        pending.append(item)
+        if len(pending) == batch_size:
+            _flush()
+    if pending:
+        _flush()
+    return outputs
+
+
+def replay_whisper_streaming(backend, audio_path,
+                             chunk_seconds=STREAM_CHUNK_SECONDS):
+    """Simulate streaming transcription of a WAV file.
+
+    The audio is fed in microphone-sized chunks and the background worker is
+    allowed to catch up (as it would while the user keeps talking), so the
+    measured latency is only the stop-to-text time spent on the tail.
+    Returns (text, tail_latency, background_latency).
+    """
+    from typeness.audio import SAMPLE_RATE
+    from typeness.streaming import StreamingTranscriber
+
+    audio = _load_wav(audio_path)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+
+    streamer = StreamingTranscriber(backend)
+    streamer.start()
+    for i in range(0, len(audio), chunk):
+        streamer.feed(audio[i:i + chunk])
+    streamer.drain()
 
     start = time.time()
-    text = process_text(llm_model, tokenizer, whisper_text)
+    text = streamer.finish()
+    latency = time.time() - start
+    return text, latency, streamer.background_seconds
+
+
+def replay_llm(backend, whisper_text, speculative=False,
+               fast_path=True, stats=None):
+    """Replay text through LLM post-processing and return (text, latency)."""
+    start = time.time()
+    text = backend.process_text(
+        whisper_text,
+        speculative=speculative, fast_path=fast_path, stats=stats,
+    )
     latency = time.time() - start
     return text, latency
 
 
-def replay_full(asr_pipeline, processor, llm_model, tokenizer, audio_path):
-    """Run full pipeline: audio -> Whisper -> LLM. Return result dict."""
-    from typeness.postprocess import process_text
-    from typeness.transcribe import transcribe
+def replay_llm_batched(backend, whisper_texts, batch_size,
+                       fast_path=True):
+    """Replay texts through batched LLM post-processing.
 
-    audio = _load_wav(audio_path)
+    Returns a list of (text, latency, route) in input order, where latency
+    is the batch wall time divided evenly among the cases in that batch.
+    """
+    from typeness.postprocess import classify_text
+
+    outputs = []
+    for i in range(0, len(whisper_texts), batch_size):
+        group = whisper_texts[i:i + batch_size]
+        start = time.time()
+        texts = backend.process_text_batch(group, fast_path=fast_path)
+        latency = (time.time() - start) / len(group)
+        for source, text in zip(group, texts):
+            route = classify_text(source)[0] if fast_path else "llm"
+            outputs.append((text, latency, route))
+    return outputs
+
+
+def verify_server_batching(backend, stage, inputs, batch_size, fast_path=True):
+    """Check the server's batched calls against single-item calls.
+
+    The server answers each request from transcribe_batch() or
+    process_text_batch() over whatever requests arrived together. Every
+    input is run as a batch of one, and inputs are grouped into batches of
+    batch_size (at least 2) that each span short to long inputs, so
+    padding is exercised. Each output must equal transcribe() or
+    process_text() on that input alone.
+
+    inputs maps case ID -> audio (whisper) or Whisper text (llm). Returns
+    case ID -> list of {"check", "batched", "sequential"} mismatches.
+    """
+    if stage == "whisper":
+        def single(item):
+            return backend.transcribe(item)
 
-    start_w = time.time()
-    whisper_text = transcribe(asr_pipeline, processor, audio)
-    whisper_latency = time.time() - start_w
+        batch = backend.transcribe_batch
+    else:
+        def single(item):
+            return backend.process_text(item, fast_path=fast_path)
 
-    start_l = time.time()
-    processed_text = process_text(llm_model, tokenizer, whisper_text)
-    llm_latency = time.time() - start_l
+        def batch(items):
+            return backend.process_text_batch(items, fast_path=fast_path)
+
+    ids = sorted(inputs, key=lambda cid: len(inputs[cid]))
+    sequential = {cid: single(inputs[cid]) for cid in ids}
+    mismatches = {cid: [] for cid in ids}
+
+    def _check(check, group):
+        for cid, text in zip(group, batch([inputs[cid] for cid in group])):
+            if text != sequential[cid]:
+                mismatches[cid].append(
+                    {"check": check, "batched": text, "sequential": sequential[cid]}
+                )
+
+    for cid in ids:
+        _check("single", [cid])
+    # Strided groups over the length-sorted inputs mix short and long ones
+    n_groups = -(-len(ids) // max(batch_size, 2))
+    for j in range(n_groups):
+        group = ids[j::n_groups]
+        if len(group) > 1:
+            _check("mixed", group)
+    return mismatches
+
+
+def replay_full(backend, audio_path,
+                streaming=False, speculative=False, fast_path=True):
+    """Run full pipeline: audio -> Whisper -> LLM. Return result dict."""
+    if streaming:
+        whisper_text, whisper_latency, _ = replay_whisper_streaming(backend, audio_path)
+    else:
+        whisper_text, whisper_latency = replay_whisper(backend, audio_path)
+
+    llm_stats = {}
+    processed_text, llm_latency = replay_llm(
+        backend, whisper_text,
+        speculative=speculative, fast_path=fast_path, stats=llm_stats,
+    )
 
     return {
         "whisper_text": whisper_text,
         "processed_text": processed_text,
         "whisper_latency": whisper_latency,
         "llm_latency": llm_latency,
+        "llm_stats": llm_stats,
     }
 
 
-def _char_diff_ratio(expected, actual):
-    """Compute character-level diff ratio: diff chars / max(len(expected), len(actual))."""
-    if expected == actual:
-        return 0.0
-    max_len = max(len(expected), len(actual))
-    if max_len == 0:
-        return 0.0
-    # Count differing characters using simple alignment
-    diff_count = 0
-    for i in range(max(len(expected), len(actual))):
-        ch_e = expected[i] if i < len(expected) else ""
-        ch_a = actual[i] if i < len(actual) else ""
-        if ch_e != ch_a:
-            diff_count += 1
-    return diff_count / max_len
-
-
-def run_all_cases(stage, asr_pipeline=None, processor=None,
-                  llm_model=None, tokenizer=None,
-                  case_id=None, tag=None):
+def run_all_cases(stage, backend=None,
+                  case_id=None, tag=None, streaming=False, speculative=False,
+                  fast_path=True, batch_size=1, verify_batch=False, cache=None,
+                  cases=None, chunked=False, compare_long_form=False, quantize=None,
+                  feature_cache=None):
     """Run replay on all matching cases and return structured results.
 
     Args:
         stage: "whisper", "llm", or "full"
-        asr_pipeline, processor: Whisper model (needed for whisper/full)
-        llm_model, tokenizer: LLM model (needed for llm/full)
+        backend: Loaded inference backend (Whisper needed for whisper/full,
+            LLM for llm/full); its name is part of the cache keys
         case_id: Filter to a single case ID
         tag: Filter to cases with this tag
+        streaming: Simulate streaming transcription (whisper/full)
+        speculative: Use prompt-lookup speculative decoding (llm/full)
+        fast_path: Let trivial inputs skip the LLM (llm/full)
+        batch_size: Decode this many fixtures per Whisper / LLM generate() call
+        verify_batch: Also run each batched case sequentially and record
+            whether the outputs are identical (batch_size > 1), and check
+            the server's batching against single-item calls (see
+            verify_server_batching())
+        cache: ReplayCache to reuse stage outputs whose inputs and config
+            are unchanged; hits report the latency measured when stored
+        cases: Explicit case list to replay instead of loading cases.json
+        chunked: Transcribe recordings longer than one Whisper window with
+            the chunked long-audio mode instead of sequential long-form
+        compare_long_form: Also run the other long-audio mode on long
+            recordings and record both latencies and CERs (whisper)
+        quantize: Quantization mode the models were loaded with; part of
+            the cache keys
+        feature_cache: FeatureCache to reuse log-mel features (and encoder
+            states) of unchanged audio when Whisper runs (not streaming)
 
     Returns:
         List of result dicts with case_id, description, stage_tested,
-        expected, actual, match, char_diff_ratio.
+        expected, actual, match, cer, punctuation_error_rate,
+        list_structure_match.
     """
-    cases = load_cases(case_id=case_id, tag=tag)
+    if cases is None:
+        cases = load_cases(case_id=case_id, tag=tag)
     results = []
 
+    # Stage outputs known before the per-case loop, from the cache or a
+    # batched run: cid -> (text, latency, background_latency | route, cached)
+    whisper_done = {}
+    llm_done = {}
+    whisper_keys = {}
+    llm_keys = {}
+
+    if stage in ("whisper", "full"):
+        if cache is not None:
+            for c in cases:
+                decode = "pipeline" if streaming else _whisper_decode_path(
+                    _case_audio(c), batch_size, chunked, feature_cache,
+                )
+                key = cache.whisper_key(
+                    _case_audio(c), streaming=streaming, chunked=chunked,
+                    quantize=quantize, backend=backend.name, decode=decode,
+                )
+                whisper_keys[c["id"]] = key
+                entry = cache.get("whisper", key)
+                if entry is not None:
+                    whisper_done[c["id"]] = (
+                        entry["text"], entry["latency"], entry.get("background_latency"), True
+                    )
+        if batch_size > 1:
+            todo = [c for c in cases if c["id"] not in whisper_done]
+            if chunked:
+                # Long recordings go through transcribe_long() per case
+                todo = [c for c in todo if not _is_long(_case_audio(c))]
+            outputs = replay_whisper_batched(
+                backend,
+                [_case_audio(c) for c in todo], batch_size, feature_cache=feature_cache,
+            )
+            for c, (text, latency) in zip(todo, outputs):
+                whisper_done[c["id"]] = (text, latency, None, False)
+
+    if stage in ("llm", "full"):
+        if stage == "llm":
+            llm_inputs = {c["id"]: c["whisper_expected"] for c in cases
+                          if c.get("whisper_expected") is not None}
+        else:
+            llm_inputs = {cid: out[0] for cid, out in whisper_done.items()}
+        if cache is not None:
+            for cid, text in llm_inputs.items():
+                key = cache.llm_key(
+                    text, speculative=speculative, fast_path=fast_path,
+                    quantize=quantize, backend=backend.name, batched=batch_size > 1,
+                )
+                llm_keys[cid] = key
+                entry = cache.get("llm", key)
+                if entry is not None:
+                    llm_done[cid] = (entry["text"], entry["latency"], entry["route"], True)
+        if batch_size > 1:
+            todo = {cid: text for cid, text in llm_inputs.items() if cid not in llm_done}
+            outputs = replay_llm_batched(
+                backend, list(todo.values()),
+                batch_size, fast_path=fast_path,
+            )
+            for cid, (text, latency, route) in zip(todo, outputs):
+                llm_done[cid] = (text, latency, route, False)
+
+    def _whisper_case(cid, audio_path):
+        if cid in whisper_done:
+            text, latency, background_latency, cached = whisper_done[cid]
+        elif streaming:
+            text, latency, background_latency = replay_whisper_streaming(backend, audio_path)
+            cached = False
+        else:
+            text, latency = replay_whisper(
+                backend, audio_path, chunked=chunked, feature_cache=feature_cache,
+            )
+            background_latency, cached = None, False
+        if cid in whisper_keys and not cached:
+            entry = {"text": text, "latency": latency}
+            if background_latency is not None:
+                entry["background_latency"] = background_latency
+            cache.put("whisper", whisper_keys[cid], entry)
+        return text, latency, background_latency, cached
+
+    def _llm_case(cid, whisper_text, llm_stats):
+        if cache is not None and cid not in llm_keys:
+            # Cases not known before the loop are processed one at a time
+            key = cache.llm_key(
+                whisper_text, speculative=speculative, fast_path=fast_path,
+                quantize=quantize, backend=backend.name, batched=False,
+            )
+            llm_keys[cid] = key
+            entry = cache.get("llm", key)
+            if entry is not None:
+                llm_done[cid] = (entry["text"], entry["latency"], entry["route"], True)
+        if cid in llm_done:
+            text, latency, llm_stats["route"], cached = llm_done[cid]
+        else:
+            text, latency = replay_llm(
+                backend, whisper_text,
+                speculative=speculative, fast_path=fast_path, stats=llm_stats,
+            )
+            cached = False
+        if cid in llm_keys and not cached:
+            cache.put("llm", llm_keys[cid], {
+                "text": text, "latency": latency, "route": llm_stats.get("route"),
+            })
+        return text, latency, cached
+
     for case in cases:
         cid = case["id"]
-        audio_path = FIXTURES_DIR / case["audio_file"]
+        audio_path = _case_audio(case)
 
         if stage == "whisper":
-            actual, _ = replay_whisper(asr_pipeline, processor, audio_path)
+            batched = cid in whisper_done and not whisper_done[cid][3]
+            actual, latency, background_latency, whisper_cached = _whisper_case(cid, audio_path)
             expected = case.get("whisper_expected")
             result_entry = {
                 "case_id": cid,
@@ -152,7 +481,34 @@ def run_all_cases(stage, asr_pipeline=None, processor=None,
                 "stage_tested": "whisper",
                 "expected": expected,
                 "actual": actual,
+                "whisper_latency": round(latency, 3),
+                "audio_seconds": round(_wav_duration(audio_path), 3),
             }
+            if background_latency is not None:
+                result_entry["whisper_background_latency"] = round(background_latency, 3)
+            if cache is not None:
+                result_entry["whisper_cached"] = whisper_cached
+            if batched and verify_batch:
+                # Batched generate() over features must match the pipeline
+                sequential, _ = replay_whisper(backend, audio_path, chunked=chunked)
+                result_entry["batch_matches_sequential"] = sequential == actual
+                if sequential != actual:
+                    result_entry["sequential_actual"] = sequential
+            if compare_long_form and expected is not None and _is_long(audio_path):
+                # The case's own run covers one mode; replay the other
+                other, other_latency = replay_whisper(backend, audio_path, chunked=not chunked)
+                modes = {
+                    "chunked" if chunked else "sequential": (actual, latency),
+                    "sequential" if chunked else "chunked": (other, other_latency),
+                }
+                result_entry["long_form"] = {
+                    mode: {
+                        "actual": text,
+                        "latency": round(mode_latency, 3),
+                        "cer": score(expected, text)["cer"],
+                    }
+                    for mode, (text, mode_latency) in modes.items()
+                }
 
         elif stage == "llm":
             # For LLM-only, use the whisper_expected as input
@@ -160,7 +516,9 @@ def run_all_cases(stage, asr_pipeline=None, processor=None,
             if whisper_input is None:
                 print(f"  Skipping {cid}: no whisper_expected for LLM-only replay")
                 continue
-            actual, _ = replay_llm(llm_model, tokenizer, whisper_input)
+            llm_stats = {}
+            batched = cid in llm_done and not llm_done[cid][3]
+            actual, latency, llm_cached = _llm_case(cid, whisper_input, llm_stats)
             expected = case["processed_expected"]
             result_entry = {
                 "case_id": cid,
@@ -168,23 +526,44 @@ def run_all_cases(stage, asr_pipeline=None, processor=None,
                 "stage_tested": "llm",
                 "expected": expected,
                 "actual": actual,
+                "llm_latency": round(latency, 3),
+                "route": llm_stats.get("route"),
             }
+            if "acceptance_rate" in llm_stats:
+                result_entry["acceptance_rate"] = round(llm_stats["acceptance_rate"], 3)
+            if cache is not None:
+                result_entry["llm_cached"] = llm_cached
+            if batched and verify_batch:
+                # Greedy decoding must not depend on batching or padding
+                sequential, _ = replay_llm(backend, whisper_input, fast_path=fast_path)
+                result_entry["batch_matches_sequential"] = sequential == actual
+                if sequential != actual:
+                    result_entry["sequential_actual"] = sequential
 
         elif stage == "full":
-            full_result = replay_full(
-                asr_pipeline, processor, llm_model, tokenizer, audio_path
-            )
+            whisper_text, whisper_latency, _, whisper_cached = _whisper_case(cid, audio_path)
+            llm_stats = {}
+            processed_text, llm_latency, llm_cached = _llm_case(cid, whisper_text, llm_stats)
             expected = case["processed_expected"]
-            actual = full_result["processed_text"]
+            actual = processed_text
             result_entry = {
                 "case_id": cid,
                 "description": case.get("description", ""),
                 "stage_tested": "full",
                 "expected": expected,
                 "actual": actual,
-                "whisper_text": full_result["whisper_text"],
-                "processed_text": full_result["processed_text"],
+                "whisper_text": whisper_text,
+                "processed_text": processed_text,
+                "whisper_latency": round(whisper_latency, 3),
+                "audio_seconds": round(_wav_duration(audio_path), 3),
+                "llm_latency": round(llm_latency, 3),
+                "route": llm_stats.get("route"),
             }
+            if "acceptance_rate" in llm_stats:
+                result_entry["acceptance_rate"] = round(llm_stats["acceptance_rate"], 3)
+            if cache is not None:
+                result_entry["whisper_cached"] = whisper_cached
+                result_entry["llm_cached"] = llm_cached
 
         else:
             raise ValueError(f"Unknown stage: {stage}")
@@ -193,40 +572,307 @@ def run_all_cases(stage, asr_pipeline=None, processor=None,
         acceptable = case.get("processed_acceptable") if stage in ("llm", "full") else case.get("whisper_acceptable")
         if expected is None:
             result_entry["match"] = "skipped"
-            result_entry["char_diff_ratio"] = None
-        elif expected == actual:
-            result_entry["match"] = "exact"
-            result_entry["char_diff_ratio"] = 0.0
-        elif acceptable is not None and acceptable == actual:
-            result_entry["match"] = "acceptable"
-            result_entry["char_diff_ratio"] = round(
-                _char_diff_ratio(expected, actual), 4
-            )
+            result_entry["cer"] = None
         else:
-            result_entry["match"] = "different"
-            result_entry["char_diff_ratio"] = round(
-                _char_diff_ratio(expected, actual), 4
-            )
+            if expected == actual:
+                result_entry["match"] = "exact"
+            elif acceptable is not None and acceptable == actual:
+                result_entry["match"] = "acceptable"
+            else:
+                result_entry["match"] = "different"
+            result_entry.update(score(expected, actual))
 
         results.append(result_entry)
 
+    if verify_batch:
+        _verify_server_batching(backend, stage, cases, results, batch_size, fast_path)
+    return results
+
+
+def _verify_server_batching(backend, stage, cases, results, batch_size, fast_path):
+    """Run verify_server_batching() for the replayed stages and annotate results."""
+    by_id = {r["case_id"]: r for r in results}
+    checks = []
+    if stage in ("whisper", "full"):
+        # Longer recordings are transcribed one at a time by the server too
+        checks.append(("whisper", {
+            c["id"]: _load_wav(_case_audio(c)) for c in cases
+            if c["id"] in by_id and not _is_long(_case_audio(c))
+        }))
+    if stage == "llm":
+        checks.append(("llm", {
+            c["id"]: c["whisper_expected"] for c in cases if c["id"] in by_id
+        }))
+    elif stage == "full":
+        checks.append(("llm", {cid: r["whisper_text"] for cid, r in by_id.items()}))
+
+    for check_stage, inputs in checks:
+        if not inputs:
+            continue
+        found = verify_server_batching(backend, check_stage, inputs, batch_size, fast_path)
+        for cid, mismatches in found.items():
+            entry = by_id[cid]
+            entry["server_batch_matches"] = entry.get("server_batch_matches", True) and not mismatches
+            if mismatches:
+                entry.setdefault("server_batch_mismatches", []).extend(
+                    {"stage": check_stage, **m} for m in mismatches
+                )
+
+
+def _is_long(audio_path):
+    """True if a fixture is longer than one Whisper window."""
+    from typeness.transcribe import MAX_BATCH_AUDIO_SECONDS
+
+    return _wav_duration(audio_path) > MAX_BATCH_AUDIO_SECONDS
+
+
+def _load_backend(stage, backend_name="torch", quantize=None):
+    """Create a backend and load only the models needed for the requested stage."""
+    from typeness.backend import create_backend
+
+    backend = create_backend(backend_name, quantize=quantize)
+    if stage in ("whisper", "full"):
+        backend.load_whisper()
+    if stage in ("llm", "full"):
+        backend.load_llm()
+    return backend
+
+
+def _case_weight(case, stage):
+    """Estimated replay cost of a case: audio seconds, or input chars for llm."""
+    if stage == "llm":
+        return len(case.get("whisper_expected") or "")
+    return _wav_duration(_case_audio(case))
+
+
+def _shard_cases(cases, stage, workers):
+    """Split cases into at most `workers` shards of similar total weight.
+
+    Longest cases are placed first, each on the currently lightest shard,
+    so one long fixture does not end up queued behind many others.
+    """
+    shards = [[] for _ in range(min(workers, len(cases)))]
+    heap = [(0.0, i) for i in range(len(shards))]
+    weighted = sorted(
+        enumerate(cases), key=lambda ic: (-_case_weight(ic[1], stage), ic[0])
+    )
+    for _, case in weighted:
+        load, i = heapq.heappop(heap)
+        shards[i].append(case)
+        heapq.heappush(heap, (load + _case_weight(case, stage), i))
+    return shards
+
+
+def _replay_shard(stage, cases, threads, use_cache, backend_name, options):
+    """Worker process entry point for run_sharded(): replay one shard.
+
+    Returns (results, cache hit/miss summary or None, feature cache
+    hit/miss summary or None).
+    """
+    import torch
+
+    sys.stdout.reconfigure(encoding="utf-8")
+    torch.set_num_threads(threads)
+
+    cache = None
+    if use_cache:
+        from typeness.replay_cache import ReplayCache
+        cache = ReplayCache()
+
+    backend = _load_backend(stage, backend_name, quantize=options.get("quantize"))
+    results = run_all_cases(stage, backend, cases=cases, cache=cache, **options)
+    feature_cache = options.get("feature_cache")
+    return (
+        results,
+        cache.summary() if cache is not None else None,
+        feature_cache.summary() if feature_cache is not None else None,
+    )
+
+
+def run_sharded(stage, workers, case_id=None, tag=None, cache=None,
+                backend_name="torch", cases=None, **options):
+    """Run replay across `workers` processes and merge the results.
+
+    Cases are balanced across shards by estimated cost; each process loads
+    its own models and gets an equal share of the CPU threads. Results come
+    back in cases.json order regardless of which shard finished first.
+    Each process creates a backend_name backend. cases replaces loading
+    cases.json. Remaining keyword arguments are passed through to
+    run_all_cases().
+    """
+    if cases is None:
+        cases = load_cases(case_id=case_id, tag=tag)
+    shards = _shard_cases(cases, stage, workers)
+    if not shards:
+        return []
+    threads = max((os.cpu_count() or 1) // len(shards), 1)
+    print(f"Replaying {len(cases)} cases on {len(shards)} workers "
+          f"({threads} threads each)")
+
+    # spawn, not fork: torch and its thread pools are not fork-safe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as pool:
+        futures = [
+            pool.submit(_replay_shard, stage, shard, threads, cache is not None,
+                        backend_name, options)
+            for shard in shards
+        ]
+        outputs = [future.result() for future in futures]
+
+    order = {c["id"]: i for i, c in enumerate(cases)}
+    results = []
+    for shard_results, cache_summary, feature_summary in outputs:
+        results.extend(shard_results)
+        if cache_summary is not None:
+            cache.merge_counts(cache_summary)
+        if feature_summary is not None:
+            options["feature_cache"].merge_counts(feature_summary)
+    results.sort(key=lambda r: order[r["case_id"]])
     return results
 
 
-def _generate_report(stage, results, output_path):
+def _mean_field(results, key):
+    """Average a numeric per-case field, or None if no case recorded it."""
+    values = [r[key] for r in results if r.get(key) is not None]
+    if not values:
+        return None
+    return round(sum(values) / len(values), 3)
+
+
+def _route_summary(results):
+    """Count LLM routes (fast path vs LLM) and match outcomes per route."""
+    summary = {}
+    for r in results:
+        route = r.get("route")
+        if route is None:
+            continue
+        counts = summary.setdefault(
+            route, {"total": 0, "exact": 0, "acceptable": 0, "different": 0}
+        )
+        counts["total"] += 1
+        if r.get("match") in counts:
+            counts[r["match"]] += 1
+    return summary
+
+
+def _long_form_summary(results):
+    """Mean latency and CER per long-audio mode over compared cases."""
+    compared = [r["long_form"] for r in results if "long_form" in r]
+    if not compared:
+        return None
+    summary = {"cases": len(compared)}
+    for mode in ("sequential", "chunked"):
+        summary[mode] = {
+            "mean_latency": _mean_field([c[mode] for c in compared], "latency"),
+            "mean_cer": _mean_field([c[mode] for c in compared], "cer"),
+        }
+    return summary
+
+
+def _compare_reports(results, baseline_path):
+    """Per-case CER and latency change against an earlier replay report.
+
+    Returns a summary over the cases scored in both runs, with the cases
+    whose output changed listed under "changed". Latencies are compared
+    over all cases present in both runs.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline_report = json.load(f)
+    baseline = {r["case_id"]: r for r in baseline_report["results"]}
+    latency = {}
+    for key in ("whisper_latency", "llm_latency"):
+        both = [(baseline[r["case_id"]], r) for r in results
+                if r.get(key) is not None and baseline.get(r["case_id"], {}).get(key) is not None]
+        if both:
+            latency[key] = {
+                "baseline": _mean_field([b for b, _ in both], key),
+                "current": _mean_field([c for _, c in both], key),
+            }
+    changed = []
+    pairs = []
+    for r in results:
+        before = baseline.get(r["case_id"])
+        if before is None or r.get("cer") is None or before.get("cer") is None:
+            continue
+        pairs.append((before["cer"], r["cer"]))
+        if before["actual"] != r["actual"]:
+            changed.append({
+                "case_id": r["case_id"],
+                "baseline_cer": before["cer"],
+                "cer": r["cer"],
+                "baseline_actual": before["actual"],
+            })
+    if not pairs:
+        return {"report": str(baseline_path), "cases": 0, "latency": latency}
+    baseline_cer = sum(b for b, _ in pairs) / len(pairs)
+    mean_cer = sum(c for _, c in pairs) / len(pairs)
+    return {
+        "report": str(baseline_path),
+        "cases": len(pairs),
+        "baseline_mean_cer": round(baseline_cer, 4),
+        "mean_cer": round(mean_cer, 4),
+        "mean_cer_delta": round(mean_cer - baseline_cer, 4),
+        "baseline_backend": baseline_report.get("backend", "torch"),
+        "latency": latency,
+        "changed": changed,
+    }
+
+
+def _generate_report(stage, results, output_path, streaming=False, batch_size=1,
+                     cache=None, workers=1, wall_seconds=None, chunked=False,
+                     quantize=None, compare_to=None, backend="torch", feature_cache=None):
     """Generate JSON report and print console summary."""
     exact_count = sum(1 for r in results if r.get("match") == "exact")
     acceptable_count = sum(1 for r in results if r.get("match") == "acceptable")
     different_count = sum(1 for r in results if r.get("match") == "different")
     total = len(results)
+    mean_whisper = _mean_field(results, "whisper_latency")
+    mean_llm = _mean_field(results, "llm_latency")
+    mean_acceptance = _mean_field(results, "acceptance_rate")
+    mean_cer = _mean_field(results, "cer")
+    mean_punctuation = _mean_field(results, "punctuation_error_rate")
+    list_mismatches = sum(1 for r in results if r.get("list_structure_match") is False)
+    routes = _route_summary(results)
+    audio_seconds = sum(r["audio_seconds"] for r in results if "audio_seconds" in r)
+    whisper_seconds = sum(r["whisper_latency"] for r in results if "audio_seconds" in r)
+    whisper_throughput = round(audio_seconds / whisper_seconds, 2) if whisper_seconds else None
+    verified = [r for r in results if "batch_matches_sequential" in r]
+    batch_mismatches = sum(1 for r in verified if not r["batch_matches_sequential"])
+    server_verified = [r for r in results if "server_batch_matches" in r]
+    server_mismatches = sum(1 for r in server_verified if not r["server_batch_matches"])
+    long_form = _long_form_summary(results)
+    comparison = _compare_reports(results, compare_to) if compare_to is not None else None
 
     report = {
         "run_timestamp": datetime.now().isoformat(timespec="seconds"),
         "stage": stage,
+        "streaming": streaming,
+        "long_form": "chunked" if chunked else "sequential",
+        "batch_size": batch_size,
+        "backend": backend,
+        "quantize": quantize,
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3) if wall_seconds is not None else None,
         "total": total,
         "exact_match": exact_count,
         "acceptable": acceptable_count,
         "different": different_count,
+        "mean_whisper_latency": mean_whisper,
+        "mean_llm_latency": mean_llm,
+        "whisper_throughput": whisper_throughput,
+        "mean_acceptance_rate": mean_acceptance,
+        "mean_cer": mean_cer,
+        "mean_punctuation_error_rate": mean_punctuation,
+        "list_structure_mismatches": list_mismatches,
+        "routes": routes,
+        "batch_verified": len(verified),
+        "batch_mismatches": batch_mismatches,
+        "server_batch_verified": len(server_verified),
+        "server_batch_mismatches": server_mismatches,
+        "long_form_comparison": long_form,
+        "comparison": comparison,
+        "cache": cache.summary() if cache is not None else None,
+        "feature_cache": feature_cache.summary() if feature_cache is not None else None,
         "results": results,
     }
 
@@ -236,6 +882,53 @@ def _generate_report(stage, results, output_path):
     # Console summary
     print(f"\n=== Replay Results ===")
     print(f"Total: {total} | Exact: {exact_count} | Acceptable: {acceptable_count} | Different: {different_count}")
+    if wall_seconds is not None:
+        print(f"Wall time           : {wall_seconds:.1f}s ({workers} worker{'s' if workers > 1 else ''})")
+    if mean_cer is not None:
+        print(f"Mean CER            : {mean_cer * 100:.1f}% "
+              f"(punctuation {mean_punctuation * 100:.1f}%, "
+              f"list structure mismatches: {list_mismatches})")
+    if mean_whisper is not None:
+        label = "stop-to-text, streaming" if streaming else "batch"
+        print(f"Mean Whisper latency: {mean_whisper:.2f}s ({label})")
+    if whisper_throughput is not None:
+        print(f"Whisper throughput  : {whisper_throughput:.1f} audio s / wall s")
+    if mean_llm is not None:
+        print(f"Mean LLM latency    : {mean_llm:.2f}s")
+    if mean_acceptance is not None:
+        print(f"Mean draft accepted : {mean_acceptance * 100:.0f}%")
+    if long_form is not None:
+        print(f"Long-form ({long_form['cases']} cases):")
+        for mode in ("sequential", "chunked"):
+            print(f"  {mode:<10}: {long_form[mode]['mean_latency']:.2f}s, "
+                  f"CER {long_form[mode]['mean_cer'] * 100:.1f}%")
+    if comparison is not None and comparison["cases"]:
+        print(f"vs {comparison['report']}: mean CER "
+              f"{comparison['baseline_mean_cer'] * 100:.1f}% -> {comparison['mean_cer'] * 100:.1f}% "
+              f"({comparison['mean_cer_delta'] * 100:+.1f} pts, "
+              f"{len(comparison['changed'])}/{comparison['cases']} outputs changed)")
+    if comparison is not None:
+        for key, means in comparison["latency"].items():
+            label = key.replace("_", " ").capitalize()
+            print(f"  {label:<16}: {means['baseline']:.2f}s -> {means['current']:.2f}s")
+    if verified:
+        print(f"Batched vs sequential: {len(verified) - batch_mismatches}/{len(verified)} identical")
+    if server_verified:
+        print(f"Server batching vs single calls: "
+              f"{len(server_verified) - server_mismatches}/{len(server_verified)} identical")
+    if cache is not None:
+        for cache_stage, counts in cache.summary().items():
+            if counts["hits"] or counts["misses"]:
+                print(f"Cache {cache_stage:<14}: {counts['hits']} hits, {counts['misses']} misses")
+    if feature_cache is not None:
+        for kind, counts in feature_cache.summary().items():
+            if counts["hits"] or counts["misses"]:
+                print(f"Cache {kind:<14}: {counts['hits']} hits, {counts['misses']} misses")
+    for route, counts in sorted(routes.items()):
+        label = "fast path" if route == "rule" else route.upper()
+        print(f"Route {label:<9}: {counts['total']} cases "
+              f"(exact {counts['exact']}, acceptable {counts['acceptable']}, "
+              f"different {counts['different']})")
     print()
 
     for r in results:
@@ -245,13 +938,17 @@ def _generate_report(stage, results, output_path):
         if match == "exact":
             print(f"[EXACT]      {cid} - {desc}")
         elif match == "acceptable":
-            ratio = r.get("char_diff_ratio", 0)
-            print(f"[ACCEPTABLE] {cid} - {desc} (diff: {ratio * 100:.1f}%)")
+            print(f"[ACCEPTABLE] {cid} - {desc} (CER: {r['cer'] * 100:.1f}%)")
         elif match == "different":
-            ratio = r.get("char_diff_ratio", 0)
-            print(f"[DIFFERENT]  {cid} - {desc} (diff: {ratio * 100:.1f}%)")
+            print(f"[DIFFERENT]  {cid} - {desc} (CER: {r['cer'] * 100:.1f}%, "
+                  f"punctuation: {r['punctuation_error_rate'] * 100:.1f}%)")
         elif match == "skipped":
             print(f"[SKIPPED]    {cid} - {desc}")
+        if r.get("batch_matches_sequential") is False:
+            print(f"             batched output differs from sequential: {r['sequential_actual']}")
+        for m in r.get("server_batch_mismatches", []):
+            print(f"             server {m['stage']} batch ({m['check']}) differs: "
+                  f"{m['batched']} vs {m['sequential']}")
 
     print(f"\nReport saved to: {output_path}")
     return report
@@ -279,36 +976,204 @@ def main():
         default=None,
         help="Filter cases by tag (e.g. short, long, technical)",
     )
+    parser.add_argument(
+        "--store",
+        nargs="?",
+        const=str(STORE_DIR),
+        default=None,
+        metavar="DIR",
+        help="Select fixtures from a capture store instead of cases.json "
+             "(default store: debug/)",
+    )
+    parser.add_argument(
+        "--text",
+        default=None,
+        help="With --store: only fixtures whose text contains this",
+    )
+    parser.add_argument(
+        "--since",
+        default=None,
+        help="With --store: only fixtures captured at or after this ISO date/time",
+    )
+    parser.add_argument(
+        "--until",
+        default=None,
+        help="With --store: only fixtures captured before this ISO date/time",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=None,
+        help="With --store: only fixtures with at least this much audio",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="With --store: only fixtures with at most this much audio",
+    )
     parser.add_argument(
         "--output",
         default=str(FIXTURES_DIR / "last_run.json"),
         help="Report output path (default: tests/fixtures/last_run.json)",
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Simulate streaming transcription for whisper/full stages",
+    )
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Transcribe recordings over 30 s as batched silence-cut windows",
+    )
+    parser.add_argument(
+        "--compare-long-form",
+        action="store_true",
+        help="Whisper stage: run recordings over 30 s in both long-audio modes and compare",
+    )
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="Use prompt-lookup speculative decoding for llm/full stages",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="Send every case through the LLM (disable the rule-based fast path)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Decode this many fixtures per Whisper / LLM generate() call (default: 1)",
+    )
+    parser.add_argument(
+        "--verify-batch",
+        action="store_true",
+        help="Check batched outputs against single-item calls: with --batch-size > 1 each "
+             "batched case is rerun sequentially, and the server's batching is checked with "
+             "batches of one and mixed-length batches of --batch-size (at least 2)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Shard cases across this many processes, each with its own models (default: 1)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="torch",
+        help="Inference engine (default: torch; onnx needs optimum[onnxruntime])",
+    )
+    parser.add_argument(
+        "--quantize",
+        choices=QUANTIZE_MODES,
+        default=None,
+        help="Load the models with dynamic int8 Linear layers (CPU only)",
+    )
+    parser.add_argument(
+        "--compare-to",
+        metavar="REPORT",
+        default=None,
+        help="Report the per-case CER and latency change against an earlier replay "
+             "report (e.g. a float run when using --quantize, or another --backend)",
+    )
+    parser.add_argument(
+        "--feature-cache",
+        action="store_true",
+        help="Reuse Whisper log-mel features of unchanged audio from .cache/features/",
+    )
+    parser.add_argument(
+        "--encoder-cache",
+        action="store_true",
+        help="Also reuse Whisper encoder states, so decoder-only changes skip the "
+             "encoder (implies --feature-cache)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recompute every stage instead of reusing cached results",
+    )
     args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.speculative and args.batch_size > 1:
+        parser.error("--speculative cannot be combined with --batch-size > 1")
+    if args.streaming and args.batch_size > 1:
+        parser.error("--streaming cannot be combined with --batch-size > 1")
+    if args.streaming and (args.chunked or args.compare_long_form):
+        parser.error("--streaming cannot be combined with --chunked or --compare-long-form")
+    if args.compare_long_form and args.stage != "whisper":
+        parser.error("--compare-long-form requires --stage whisper")
+    if args.backend == "onnx" and args.quantize is not None:
+        parser.error("--backend onnx cannot be combined with --quantize")
+    if args.streaming and (args.feature_cache or args.encoder_cache):
+        parser.error("--streaming cannot be combined with --feature-cache or --encoder-cache")
+    query = {
+        "text": args.text, "since": args.since, "until": args.until,
+        "min_seconds": args.min_seconds, "max_seconds": args.max_seconds,
+    }
+    if args.store is None and any(value is not None for value in query.values()):
+        parser.error("--text, --since, --until, --min-seconds and --max-seconds require --store")
+    cases = None
+    if args.store is not None:
+        cases = load_cases(case_id=args.case, tag=args.tag, store=args.store, **query)
+        print(f"Selected {len(cases)} fixtures from {args.store}")
 
-    # Load only the models needed for the requested stage
-    asr_pipeline = processor = None
-    llm_model = tokenizer = None
-
-    if args.stage in ("whisper", "full"):
-        from typeness.transcribe import load_whisper
-        asr_pipeline, processor = load_whisper()
-
-    if args.stage in ("llm", "full"):
-        from typeness.postprocess import load_llm
-        llm_model, tokenizer = load_llm()
-
-    results = run_all_cases(
-        stage=args.stage,
-        asr_pipeline=asr_pipeline,
-        processor=processor,
-        llm_model=llm_model,
-        tokenizer=tokenizer,
-        case_id=args.case,
-        tag=args.tag,
-    )
+    cache = None
+    if not args.no_cache:
+        from typeness.replay_cache import ReplayCache
+        cache = ReplayCache()
 
-    _generate_report(args.stage, results, args.output)
+    options = {
+        "streaming": args.streaming,
+        "speculative": args.speculative,
+        "fast_path": not args.no_fast_path,
+        "batch_size": args.batch_size,
+        "verify_batch": args.verify_batch,
+        "chunked": args.chunked,
+        "compare_long_form": args.compare_long_form,
+        "quantize": args.quantize,
+        "feature_cache": None,
+    }
+    if args.feature_cache or args.encoder_cache:
+        from typeness.feature_cache import FeatureCache
+        options["feature_cache"] = FeatureCache(
+            encoder=args.encoder_cache, quantize=args.quantize
+        )
+    start = time.time()
+    if args.workers > 1:
+        results = run_sharded(
+            args.stage, args.workers, case_id=args.case, tag=args.tag,
+            cache=cache, backend_name=args.backend, cases=cases, **options,
+        )
+    else:
+        results = run_all_cases(
+            stage=args.stage,
+            backend=_load_backend(args.stage, args.backend, quantize=args.quantize),
+            case_id=args.case,
+            tag=args.tag,
+            cache=cache,
+            cases=cases,
+            **options,
+        )
+    wall_seconds = time.time() - start
+
+    _generate_report(
+        args.stage, results, args.output,
+        streaming=args.streaming, batch_size=args.batch_size, cache=cache,
+        workers=args.workers, wall_seconds=wall_seconds, chunked=args.chunked,
+        quantize=args.quantize, compare_to=args.compare_to, backend=args.backend,
+        feature_cache=options["feature_cache"],
+    )
+    if cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            print(f"Evicted {evicted} stale cache entries")
 
 
 if __name__ == "__main__":
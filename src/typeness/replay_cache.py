@@ -0,0 +1,236 @@
+"""Content-addressed result cache for the Typeness replay engine.
+
+Whisper and LLM stage outputs are stored on disk under a key derived from
+the model ID, a hash of the prompt/decoding config, and a hash of the input
+audio or text, so replay can skip stage work whose inputs are unchanged.
+The config includes CACHE_VERSION and a hash of the source of the stage's
+module (transcribe.py, postprocess.py), so editing either invalidates its
+entries. Changes to code elsewhere are not detected; bump CACHE_VERSION or
+use --no-cache.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from typeness.capture_store import read_audio_bytes
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / ".cache" / "replay"
+
+# Evict least recently used entries beyond this total size, and any entry
+# not used for this long
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Bump when a change outside the hashed modules changes stage output
+CACHE_VERSION = 1
+
+# How Whisper is invoked for a recording; the paths pad and batch differently,
+# so their outputs are cached separately
+WHISPER_DECODE_PATHS = ("pipeline", "features", "encoder", "batched", "batched-encoder")
+
+
+def _digest(value) -> str:
+    """SHA-256 of a JSON-serializable value or raw bytes."""
+    if not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(value).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _source_digest(module_name: str) -> str:
+    """SHA-256 of a module's source file (read once per process)."""
+    module = importlib.import_module(module_name)
+    return _digest(Path(module.__file__).read_bytes())
+
+
+def whisper_config(streaming: bool = False, chunked: bool = False,
+                   quantize: str | None = None, backend: str = "torch",
+                   decode: str = "pipeline") -> dict:
+    """Settings that determine Whisper output for a given recording.
+
+    decode is one of WHISPER_DECODE_PATHS: the transformers pipeline,
+    generate() on (cached) features, on cached encoder states, or batched
+    generate() with or without cached encoder states.
+    """
+    if decode not in WHISPER_DECODE_PATHS:
+        raise ValueError(f"Unknown Whisper decode path: {decode}")
+    from typeness.transcribe import (
+        WHISPER_GENERATE_KWARGS,
+        WHISPER_INITIAL_PROMPT,
+        WHISPER_MODEL_ID,
+    )
+
+    config = {
+        "cache_version": CACHE_VERSION,
+        "source": _source_digest("typeness.transcribe"),
+        "model_id": WHISPER_MODEL_ID,
+        "initial_prompt": WHISPER_INITIAL_PROMPT,
+        "generate_kwargs": WHISPER_GENERATE_KWARGS,
+        "streaming": streaming,
+        "decode": decode,
+        "quantize": quantize,
+        "backend": backend,
+    }
+    if streaming:
+        from typeness.streaming import STREAM_CUT_SEARCH_SECONDS, STREAM_WINDOW_SECONDS
+
+        config["streaming_source"] = _source_digest("typeness.streaming")
+        config["stream_window_seconds"] = STREAM_WINDOW_SECONDS
+        config["stream_cut_search_seconds"] = STREAM_CUT_SEARCH_SECONDS
+    elif chunked:
+        from typeness.transcribe import (
+            LONG_FORM_CUT_SEARCH_SECONDS,
+            LONG_FORM_MAX_OVERLAP_CHARS,
+            LONG_FORM_OVERLAP_SECONDS,
+        )
+
+        config["long_form"] = "chunked"
+        config["long_form_cut_search_seconds"] = LONG_FORM_CUT_SEARCH_SECONDS
+        config["long_form_overlap_seconds"] = LONG_FORM_OVERLAP_SECONDS
+        config["long_form_max_overlap_chars"] = LONG_FORM_MAX_OVERLAP_CHARS
+    return config
+
+
+def llm_config(speculative: bool = False, fast_path: bool = True,
+               quantize: str | None = None, backend: str = "torch",
+               batched: bool = False) -> dict:
+    """Settings that determine LLM post-processing output for a given text.
+
+    batched marks process_text_batch() output: left-padded batches need not
+    match process_text(), so the two are cached separately.
+    """
+    from typeness.postprocess import (
+        FAST_PATH_MAX_CHARS,
+        LLM_GENERATE_KWARGS,
+        LLM_MODEL_ID,
+        LLM_SYSTEM_PROMPT,
+        PROMPT_LOOKUP_NUM_TOKENS,
+    )
+
+    config = {
+        "cache_version": CACHE_VERSION,
+        "source": _source_digest("typeness.postprocess"),
+        "model_id": LLM_MODEL_ID,
+        "system_prompt": LLM_SYSTEM_PROMPT,
+        "generate_kwargs": LLM_GENERATE_KWARGS,
+        "speculative": speculative,
+        "fast_path": fast_path,
+        "batched": batched,
+        "quantize": quantize,
+        "backend": backend,
+    }
+    if speculative:
+        config["prompt_lookup_num_tokens"] = PROMPT_LOOKUP_NUM_TOKENS
+    if fast_path:
+        config["fast_path_max_chars"] = FAST_PATH_MAX_CHARS
+    return config
+
+
+class ReplayCache:
+    """On-disk cache of per-stage replay results.
+
+    Entries live in <cache_dir>/<stage>/<key>.json; a hit refreshes the
+    file's mtime so evict() can drop the least recently used entries.
+    Hit and miss counts are kept per stage for the replay report.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, *,
+                 max_bytes: int = CACHE_MAX_BYTES,
+                 max_age_seconds: float = CACHE_MAX_AGE_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = {"whisper": 0, "llm": 0}
+        self.misses = {"whisper": 0, "llm": 0}
+
+    @staticmethod
+    def whisper_key(audio_path, streaming: bool = False, chunked: bool = False,
+                    quantize: str | None = None, backend: str = "torch",
+                    decode: str = "pipeline") -> str:
+        """Key for the Whisper result of a WAV file."""
+        config = whisper_config(streaming, chunked, quantize, backend, decode)
+        audio_hash = _digest(read_audio_bytes(audio_path))
+        return _digest([config["model_id"], _digest(config), audio_hash])
+
+    @staticmethod
+    def llm_key(text: str, speculative: bool = False, fast_path: bool = True,
+                quantize: str | None = None, backend: str = "torch",
+                batched: bool = False) -> str:
+        """Key for the LLM post-processing result of a transcript."""
+        config = llm_config(speculative, fast_path, quantize, backend, batched)
+        return _digest([config["model_id"], _digest(config), _digest(text)])
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / f"{key}.json"
+
+    def get(self, stage: str, key: str) -> dict | None:
+        """Return the cached entry for key, or None on a miss."""
+        path = self._path(stage, key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses[stage] += 1
+            return None
+        self.hits[stage] += 1
+        return entry
+
+    def put(self, stage: str, key: str, entry: dict) -> None:
+        """Store entry under key, replacing any previous value."""
+        path = self._path(stage, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Per-process temp name: sharded replay workers share the cache
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as exc:
+            print(f"[Cache] Warning: failed to store {stage} result — {exc}")
+
+    def evict(self) -> int:
+        """Remove expired entries, then the oldest until under max_bytes.
+
+        Returns the number of entries removed.
+        """
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age_seconds and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def merge_counts(self, summary: dict) -> None:
+        """Add hit/miss counts from another process's summary()."""
+        for stage, counts in summary.items():
+            self.hits[stage] += counts["hits"]
+            self.misses[stage] += counts["misses"]
+
+    def summary(self) -> dict:
+        """Hit/miss counts per stage, as stored in the replay report."""
+        return {
+            stage: {"hits": self.hits[stage], "misses": self.misses[stage]}
+            for stage in self.hits
+        }
@@ -0,0 +1,95 @@
+"""Replay scoring module for Typeness.
+
+Edit-distance metrics for comparing expected and actual transcripts:
+character error rate, punctuation-only error rate and list-structure match.
+"""
+
+import re
+import unicodedata
+
+# A list item line: "1. ", "2、", "3) ", "- ", "* ", "• "
+_LIST_ITEM = re.compile(r"^\s*(?:(\d+)\s*[.、)]|[-*•])\s*")
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Character-level edit distance (insert, delete, substitute).
+
+    Bit-parallel (Myers/Hyyrö): each column of the DP matrix is held as
+    bit vectors in one Python int, so the cost is O(len(a) * len(b) / 64)
+    word operations instead of O(len(a) * len(b)) Python steps.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if m == 0:
+        return len(a)
+
+    # peq[ch] has bit i set where b[i] == ch
+    peq: dict[str, int] = {}
+    for i, ch in enumerate(b):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv = mask, 0
+    score = m
+    for ch in a:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+
+def _error_rate(expected: str, actual: str) -> float:
+    """Edit distance normalized by the expected length."""
+    if not expected:
+        return 0.0 if not actual else 1.0
+    return levenshtein(expected, actual) / len(expected)
+
+
+def cer(expected: str, actual: str) -> float:
+    """Character error rate: edits needed to turn expected into actual, per expected char."""
+    return _error_rate(expected, actual)
+
+
+def _punctuation(text: str) -> str:
+    return "".join(ch for ch in text if unicodedata.category(ch).startswith("P"))
+
+
+def punctuation_error_rate(expected: str, actual: str) -> float:
+    """Error rate over the punctuation marks only, ignoring all other characters."""
+    return _error_rate(_punctuation(expected), _punctuation(actual))
+
+
+def list_structure(text: str) -> list[str]:
+    """Markers of the list item lines in text, e.g. ["1", "2", "-"]."""
+    markers = []
+    for line in text.splitlines():
+        match = _LIST_ITEM.match(line)
+        if match:
+            markers.append(match.group(1) or "-")
+    return markers
+
+
+def list_structure_match(expected: str, actual: str) -> bool:
+    """True if both texts have the same sequence of list items (or neither has one)."""
+    return list_structure(expected) == list_structure(actual)
+
+
+def score(expected: str, actual: str) -> dict:
+    """All replay metrics for one case, rounded for the JSON report."""
+    return {
+        "cer": round(cer(expected, actual), 4),
+        "punctuation_error_rate": round(punctuation_error_rate(expected, actual), 4),
+        "list_structure_match": list_structure_match(expected, actual),
+    }
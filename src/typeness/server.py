@@ -0,0 +1,255 @@
+"""Local inference server for Typeness.
+
+Serves transcription and post-processing over localhost HTTP so several
+dictation seats can share one set of loaded models. Concurrent requests
+are coalesced into batched Whisper and LLM calls.
+
+Endpoints (responses are JSON):
+    POST /transcribe   body: 16 kHz mono int16 WAV  -> whisper_text
+    POST /process      body: {"text": "..."}        -> processed_text
+    POST /dictate      body: 16 kHz mono int16 WAV  -> whisper_text + processed_text
+    GET  /health                                    -> model readiness
+
+Usage:
+    uv run python -m typeness.server
+    uv run python -m typeness.server --port 8765 --max-batch 8 --max-delay-ms 20
+"""
+
+import argparse
+import io
+import json
+import queue
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import transformers
+
+from typeness.audio import CHANNELS, SAMPLE_RATE
+from typeness.backend import BACKENDS, create_backend
+from typeness.loader import ModelLoader
+from typeness.quantize import QUANTIZE_MODES
+
+# Suppress noisy warnings from transformers (duplicate logits-processor, invalid generation flags)
+transformers.logging.set_verbosity_error()
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_DELAY_MS = 20.0
+
+
+class DynamicBatcher:
+    """Coalesces concurrent requests into batched calls on one worker thread.
+
+    The worker takes the first waiting request, then keeps collecting until
+    max_batch requests are gathered or max_delay seconds have passed since
+    that first request, and runs batch_fn over the whole group.
+    """
+
+    def __init__(self, name: str, batch_fn, max_batch: int, max_delay: float) -> None:
+        self.name = name
+        self._batch_fn = batch_fn
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._requests: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """Queue one item; the future resolves to (result, timing dict)."""
+        future: Future = Future()
+        self._requests.put((item, future, time.time()))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._requests.get()]
+            deadline = batch[0][2] + self._max_delay
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            start = time.time()
+            try:
+                results = self._batch_fn([item for item, _, _ in batch])
+            except Exception as exc:
+                print(f"[{self.name}] batch of {len(batch)} failed: {exc}")
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+            compute = time.time() - start
+
+            for (_, future, submitted), result in zip(batch, results):
+                future.set_result((result, {
+                    "queue_seconds": round(start - submitted, 4),
+                    "compute_seconds": round(compute, 4),
+                    "batch_size": len(batch),
+                }))
+
+
+def _decode_wav(data: bytes) -> np.ndarray:
+    """Decode a 16 kHz mono int16 WAV body into a float32 array."""
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        if (wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != CHANNELS
+                or wf.getsampwidth() != 2):
+            raise ValueError(f"expected {SAMPLE_RATE} Hz mono 16-bit WAV")
+        raw = wf.readframes(wf.getnframes())
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32767.0
+
+
+class InferenceService:
+    """Owns the models and one batcher per stage."""
+
+    def __init__(self, max_batch: int, max_delay: float, fast_path: bool = True, *,
+                 warmup: bool = False, compile: bool = False,
+                 quantize: str | None = None, backend: str = "torch") -> None:
+        self.models = ModelLoader(
+            create_backend(backend, compile=compile, quantize=quantize),
+            warmup=warmup or compile,
+        )
+        self._fast_path = fast_path
+        self.whisper = DynamicBatcher("whisper", self._transcribe, max_batch, max_delay)
+        self.llm = DynamicBatcher("llm", self._process, max_batch, max_delay)
+
+    def start(self) -> None:
+        self.models.start()
+        self.whisper.start()
+        self.llm.start()
+
+    def _transcribe(self, audios):
+        return self.models.whisper().transcribe_batch(audios)
+
+    def _process(self, texts):
+        return self.models.llm().process_text_batch(texts, fast_path=self._fast_path)
+
+
+def _make_handler(service: InferenceService):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length", 0))
+            return self.rfile.read(length)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._send_json(404, {"error": "not found"})
+                return
+            self._send_json(200, {
+                "whisper_ready": service.models.whisper_ready,
+                "ready": service.models.ready,
+            })
+
+        def do_POST(self):
+            start = time.time()
+            try:
+                if self.path == "/transcribe":
+                    audio = _decode_wav(self._read_body())
+                    text, timing = service.whisper.submit(audio).result()
+                    payload = {"whisper_text": text, "whisper": timing}
+                elif self.path == "/process":
+                    text = json.loads(self._read_body())["text"]
+                    processed, timing = service.llm.submit(text).result()
+                    payload = {"processed_text": processed, "llm": timing}
+                elif self.path == "/dictate":
+                    audio = _decode_wav(self._read_body())
+                    text, whisper_timing = service.whisper.submit(audio).result()
+                    processed, llm_timing = service.llm.submit(text).result() \
+                        if text.strip() else ("", None)
+                    payload = {
+                        "whisper_text": text,
+                        "processed_text": processed,
+                        "whisper": whisper_timing,
+                        "llm": llm_timing,
+                    }
+                else:
+                    self._send_json(404, {"error": "not found"})
+                    return
+            except (ValueError, KeyError, wave.Error) as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            except Exception as exc:
+                self._send_json(500, {"error": str(exc)})
+                return
+
+            payload["total_seconds"] = round(time.time() - start, 4)
+            self._send_json(200, payload)
+            print(f"{self.path} from {self.client_address[0]}: "
+                  f"{payload['total_seconds']:.2f}s")
+
+    return Handler
+
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(
+        description="Typeness local inference server with dynamic batching"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help=f"Maximum requests per batched call (default: {DEFAULT_MAX_BATCH})")
+    parser.add_argument("--max-delay-ms", type=float, default=DEFAULT_MAX_DELAY_MS,
+                        help="Longest a request waits for others to join its batch "
+                             f"(default: {DEFAULT_MAX_DELAY_MS:g})")
+    parser.add_argument("--no-fast-path", action="store_true",
+                        help="Send every text through the LLM (disable the rule-based fast path)")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Warm both models up on synthetic input before serving")
+    parser.add_argument("--compile", action="store_true",
+                        help="Compile both models with a static KV cache (implies --warmup)")
+    parser.add_argument("--quantize", choices=QUANTIZE_MODES, default=None,
+                        help="Load both models with dynamic int8 Linear layers (CPU only)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="Inference engine (default: torch; onnx needs optimum[onnxruntime])")
+    args = parser.parse_args()
+    if args.compile and args.quantize is not None:
+        parser.error("--compile cannot be combined with --quantize")
+    if args.backend == "onnx" and (args.compile or args.quantize is not None):
+        parser.error("--backend onnx cannot be combined with --compile or --quantize")
+
+    service = InferenceService(
+        args.max_batch, args.max_delay_ms / 1000, fast_path=not args.no_fast_path,
+        warmup=args.warmup, compile=args.compile, quantize=args.quantize,
+        backend=args.backend,
+    )
+    service.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(service))
+    print(f"Typeness server listening on http://{args.host}:{args.port}/ "
+          "(models loading in the background)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Bye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Streaming transcription module for Typeness.
+
+Transcribes committed audio windows in a background thread while the user
+is still speaking, so that only the final tail segment has to be decoded
+after the stop hotkey.
+"""
+
+import queue
+import threading
+import time
+
+import numpy as np
+
+from typeness.audio import MIN_RECORDING_SECONDS, SAMPLE_RATE
+from typeness.backend import Backend
+from typeness.transcribe import _join_segments
+
+# Commit a window once this much uncommitted audio has accumulated
+STREAM_WINDOW_SECONDS = 8.0
+# Search the last part of the window for the quietest point to cut at,
+# so words are not split across windows
+STREAM_CUT_SEARCH_SECONDS = 2.0
+_CUT_FRAME_SECONDS = 0.03
+
+
+def _find_cut(audio: np.ndarray) -> int:
+    """Return the sample index of the quietest frame in the cut search region."""
+    frame = int(_CUT_FRAME_SECONDS * SAMPLE_RATE)
+    search = int(STREAM_CUT_SEARCH_SECONDS * SAMPLE_RATE)
+    region_start = max(len(audio) - search, 0)
+    region = audio[region_start:]
+    n_frames = len(region) // frame
+    if n_frames == 0:
+        return len(audio)
+    frames = region[: n_frames * frame].reshape(n_frames, frame)
+    energy = np.mean(frames * frames, axis=1)
+    quietest = int(np.argmin(energy))
+    return region_start + quietest * frame + frame // 2
+
+
+class StreamingTranscriber:
+    """Incrementally transcribes audio as it is being recorded.
+
+    Chunks are fed from the audio callback via feed(). A worker thread
+    accumulates them and, whenever STREAM_WINDOW_SECONDS of audio is pending,
+    cuts at the quietest nearby frame and transcribes that committed window.
+    finish() stops the worker and decodes only the remaining tail.
+    """
+
+    def __init__(self, backend: Backend,
+                 window_seconds: float = STREAM_WINDOW_SECONDS) -> None:
+        self._backend = backend
+        self._window_samples = int(window_seconds * SAMPLE_RATE)
+        self._chunks: queue.Queue[np.ndarray | None] = queue.Queue()
+        self._pending: list[np.ndarray] = []
+        self._pending_samples = 0
+        self._segments: list[str] = []
+        self._thread: threading.Thread | None = None
+        self._cancelled = False
+        self.windows = 0
+        self.background_seconds = 0.0
+
+    def start(self) -> None:
+        """Start the background worker thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: np.ndarray) -> None:
+        """Queue a captured chunk (safe to call from the audio callback)."""
+        self._chunks.put(chunk)
+
+    def drain(self) -> None:
+        """Block until every chunk fed so far has been consumed by the worker."""
+        self._chunks.join()
+
+    def _run(self) -> None:
+        while True:
+            chunk = self._chunks.get()
+            try:
+                if chunk is None:
+                    return
+                if self._cancelled:
+                    continue
+                self._pending.append(chunk.reshape(-1))
+                self._pending_samples += chunk.size
+                if self._pending_samples >= self._window_samples:
+                    self._commit_window()
+            finally:
+                self._chunks.task_done()
+
+    def _commit_window(self) -> None:
+        audio = np.concatenate(self._pending)
+        cut = _find_cut(audio)
+        window, rest = audio[:cut], audio[cut:]
+        self._pending = [rest]
+        self._pending_samples = len(rest)
+
+        start = time.time()
+        self._segments.append(self._backend.transcribe(window))
+        self.background_seconds += time.time() - start
+        self.windows += 1
+
+    def _stop_worker(self) -> None:
+        if self._thread is not None:
+            self._chunks.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def cancel(self) -> None:
+        """Discard everything and stop the worker without transcribing the tail."""
+        self._cancelled = True
+        self._stop_worker()
+
+    def finish(self) -> str:
+        """Stop the worker, transcribe the tail, and return the full transcript."""
+        self._stop_worker()
+        # A near-empty tail after committed windows only invites hallucinations
+        min_tail = int(MIN_RECORDING_SECONDS * SAMPLE_RATE) if self._segments else 1
+        if self._pending_samples >= min_tail:
+            tail = np.concatenate(self._pending)
+            self._segments.append(self._backend.transcribe(tail))
+            self._pending = []
+            self._pending_samples = 0
+        return _join_segments(self._segments)
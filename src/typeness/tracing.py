@@ -0,0 +1,163 @@
+"""Hot-path timing spans for Typeness.
+
+Spans are written as one JSON object per line to a trace file and, if an
+endpoint is started, aggregated into a Prometheus text-format histogram.
+Tracing is off by default; span() then returns a shared no-op object, so
+instrumented code costs one flag check per span.
+
+    with tracing.span("llm.tokenize", chars=len(text)):
+        ...
+    tracing.record("llm.prefill", seconds)
+"""
+
+import atexit
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds for the Prometheus endpoint
+PROMETHEUS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = False
+_lock = threading.Lock()
+_trace_file = None
+# span name -> [bucket counts..., count, sum]; only filled while serving metrics
+_histograms: dict[str, list] | None = None
+_metrics_server: ThreadingHTTPServer | None = None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name: str, attrs: dict) -> None:
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        record(self.name, time.perf_counter() - self.start, **self.attrs)
+
+
+def enabled() -> bool:
+    """True if spans are being recorded."""
+    return _enabled
+
+
+def span(name: str, **attrs):
+    """Context manager timing the enclosed block as span `name`."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name, attrs)
+
+
+def record(name: str, seconds: float, **attrs) -> None:
+    """Record an already measured duration as span `name`."""
+    if not _enabled:
+        return
+    entry = {
+        "ts": round(time.time() - seconds, 6),
+        "span": name,
+        "ms": round(seconds * 1000, 3),
+        "thread": threading.current_thread().name,
+    }
+    if attrs:
+        entry.update(attrs)
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.write(line)
+        if _histograms is not None:
+            counts = _histograms.get(name)
+            if counts is None:
+                counts = _histograms[name] = [0] * (len(PROMETHEUS_BUCKETS) + 2)
+            for i, bound in enumerate(PROMETHEUS_BUCKETS):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += seconds
+
+
+def _render_prometheus() -> str:
+    """Current span histograms in Prometheus text exposition format."""
+    lines = [
+        "# HELP typeness_span_seconds Duration of instrumented hot-path spans.",
+        "# TYPE typeness_span_seconds histogram",
+    ]
+    with _lock:
+        snapshot = {name: list(counts) for name, counts in (_histograms or {}).items()}
+    for name, counts in sorted(snapshot.items()):
+        for bound, count in zip(PROMETHEUS_BUCKETS, counts):
+            lines.append(f'typeness_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+        lines.append(f'typeness_span_seconds_bucket{{span="{name}",le="+Inf"}} {counts[-2]}')
+        lines.append(f'typeness_span_seconds_sum{{span="{name}"}} {counts[-1]:.6f}')
+        lines.append(f'typeness_span_seconds_count{{span="{name}"}} {counts[-2]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = _render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def enable(trace_path=None, metrics_port: int | None = None,
+           metrics_host: str = "127.0.0.1") -> None:
+    """Start recording spans to trace_path and/or a /metrics endpoint."""
+    global _enabled, _trace_file, _histograms, _metrics_server
+    with _lock:
+        if trace_path is not None and _trace_file is None:
+            _trace_file = open(trace_path, "a", encoding="utf-8", buffering=1)
+        if metrics_port is not None and _histograms is None:
+            _histograms = {}
+    if metrics_port is not None and _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((metrics_host, metrics_port), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        print(f"[Trace] Prometheus metrics at http://{metrics_host}:{metrics_port}/metrics")
+    if trace_path is not None:
+        print(f"[Trace] Writing spans to {trace_path}")
+    _enabled = _trace_file is not None or _histograms is not None
+
+
+def disable() -> None:
+    """Stop recording, close the trace file and shut down the endpoint."""
+    global _enabled, _trace_file, _histograms, _metrics_server
+    _enabled = False
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+        _histograms = None
+    if _metrics_server is not None:
+        _metrics_server.shutdown()
+        _metrics_server.server_close()
+        _metrics_server = None
+
+
+atexit.register(disable)
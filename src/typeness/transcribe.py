@@ -4,6 +4,7 @@ Loads the Whisper model and provides transcription with CJK text normalization.
 """
 
 import re
+import threading
 import time
 
 import numpy as np
@@ -13,9 +14,46 @@ from transformers import (
     AutoProcessor,
     pipeline,
 )
+from transformers.modeling_outputs import BaseModelOutput
+
+from typeness import tracing
+from typeness.quantize import quantize_model
 
 WHISPER_MODEL_ID = "openai/whisper-large-v3-turbo"
 WHISPER_INITIAL_PROMPT = "以下是繁體中文的語音內容。"
+# Decoding options shared by every transcription path (prompt_ids added per call)
+WHISPER_GENERATE_KWARGS = {"language": "zh", "task": "transcribe"}
+
+# Whisper's native window; longer inputs take the sequential long-form path
+# and are not batched
+MAX_BATCH_AUDIO_SECONDS = 30.0
+
+# Chunked long-audio mode: windows of at most MAX_BATCH_AUDIO_SECONDS are cut
+# at the quietest frame in their last LONG_FORM_CUT_SEARCH_SECONDS, and each
+# window repeats LONG_FORM_OVERLAP_SECONDS before the cut so a word on the
+# boundary is heard whole; the duplicated text is removed when stitching
+LONG_FORM_CUT_SEARCH_SECONDS = 5.0
+LONG_FORM_OVERLAP_SECONDS = 1.0
+LONG_FORM_BATCH_SIZE = 8
+# Longest repeated text looked for at a window boundary
+LONG_FORM_MAX_OVERLAP_CHARS = 24
+_CUT_FRAME_SECONDS = 0.03
+_BOUNDARY_PUNCTUATION = "，。！？、；：,.!?;: "
+
+# Decoder tokens Whisper places after the prompt and before the transcript
+# (<|startoftranscript|>, language, task, <|notimestamps|>); with compile=True
+# the static KV cache holds the rest of max_target_positions
+_DECODER_START_TOKENS = 4
+# Synthetic recording used to warm the model up at load time
+WARMUP_AUDIO_SECONDS = 2.0
+
+# Serializes pipeline calls: streaming windows of the current recording and
+# earlier jobs in the processing pipeline may transcribe from different threads
+_pipeline_lock = threading.Lock()
+
+# (processor id, device, prompt) -> prompt_ids tensor; the prompt is constant
+# per session, so it is tokenized once rather than on every call
+_prompt_ids_cache: dict[tuple, torch.Tensor] = {}
 
 # Half-width -> full-width punctuation mapping for CJK text
 _PUNCTUATION_MAP = str.maketrans({
@@ -34,6 +72,55 @@ def _normalize_punctuation(text: str) -> str:
     return text.translate(_PUNCTUATION_MAP)
 
 
+def _join_segments(segments: list[str]) -> str:
+    """Concatenate window transcripts, adding a space only between Latin words."""
+    text = ""
+    for segment in segments:
+        segment = segment.strip()
+        if not segment:
+            continue
+        if text and text[-1].isascii() and text[-1].isalnum() \
+                and segment[0].isascii() and segment[0].isalnum():
+            text += " "
+        text += segment
+    return text
+
+
+def _merge_overlap(left: str, right: str) -> str:
+    """Join two window transcripts, dropping text repeated across the overlap.
+
+    Looks for the longest start of `right` (at least two characters) that
+    ends `left`, ignoring punctuation Whisper added at the end of `left`.
+    """
+    core = left.rstrip(_BOUNDARY_PUNCTUATION)
+    body = right.lstrip()
+    for k in range(min(len(core), len(body), LONG_FORM_MAX_OVERLAP_CHARS), 1, -1):
+        if core.endswith(body[:k]):
+            return _join_segments([core, body[k:]]) if body[k:] else left
+    return _join_segments([left, right])
+
+
+def _split_long_audio(audio: np.ndarray, sample_rate: int) -> list[np.ndarray]:
+    """Cut audio into overlapping windows of at most MAX_BATCH_AUDIO_SECONDS."""
+    max_samples = int(MAX_BATCH_AUDIO_SECONDS * sample_rate)
+    search = int(LONG_FORM_CUT_SEARCH_SECONDS * sample_rate)
+    overlap = int(LONG_FORM_OVERLAP_SECONDS * sample_rate)
+    frame = int(_CUT_FRAME_SECONDS * sample_rate)
+
+    windows = []
+    start = 0
+    while len(audio) - start > max_samples:
+        end = start + max_samples
+        n_frames = search // frame
+        region = audio[end - n_frames * frame:end].reshape(n_frames, frame)
+        quietest = int(np.argmin(np.mean(region * region, axis=1)))
+        cut = end - (n_frames - quietest) * frame + frame // 2
+        windows.append(audio[start:cut])
+        start = cut - overlap
+    windows.append(audio[start:])
+    return windows
+
+
 def _add_cjk_spacing(text: str) -> str:
     """Insert a space between CJK and Latin/digit characters where missing."""
     # CJK before Latin/digit: 中A -> 中 A
@@ -47,8 +134,17 @@ def _add_cjk_spacing(text: str) -> str:
     return text
 
 
-def load_whisper():
-    """Load Whisper model and return the ASR pipeline and processor."""
+def load_whisper(*, warmup: bool = False, compile: bool = False, quantize: str | None = None):
+    """Load Whisper model and return the ASR pipeline and processor.
+
+    With compile=True the decoder uses a static KV cache and its forward
+    pass is compiled with torch.compile; compilation happens on the first
+    calls, so combine it with warmup=True, which runs warmup_whisper()
+    before returning. quantize="int8" applies dynamic int8 quantization on
+    CPU (see typeness.quantize); it cannot be combined with compile.
+    """
+    if compile and quantize is not None:
+        raise ValueError("compile cannot be combined with quantize")
     device = "cuda" if torch.cuda.is_available() else "cpu"
     torch_dtype = torch.float16 if device == "cuda" else torch.float32
 
@@ -58,8 +154,12 @@ def load_whisper():
         dtype=torch_dtype,
         low_cpu_mem_usage=True,
     ).to(device)
-
+    model = quantize_model(model, quantize)
     processor = AutoProcessor.from_pretrained(WHISPER_MODEL_ID)
+    if compile:
+        model.generation_config.cache_implementation = "static"
+        model.generation_config.max_new_tokens = _compile_max_new_tokens(model, processor)
+        model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=True)
 
     asr_pipeline = pipeline(
         "automatic-speech-recognition",
@@ -70,27 +170,266 @@ def load_whisper():
         device=device,
     )
     print("Whisper model loaded.")
+    _prompt_ids(asr_pipeline, processor)
+    if warmup:
+        warmup_whisper(asr_pipeline, processor)
     return asr_pipeline, processor
 
 
-def transcribe(asr_pipeline, processor, audio: np.ndarray) -> str:
-    """Transcribe audio using the Whisper pipeline."""
+def _compile_max_new_tokens(model, processor) -> int:
+    """Largest max_new_tokens the decoder accepts after WHISPER_INITIAL_PROMPT."""
+    prompt_length = len(processor.get_prompt_ids(WHISPER_INITIAL_PROMPT))
+    return model.config.max_target_positions - prompt_length - _DECODER_START_TOKENS
+
+
+def _warn_if_capped(model, n_tokens: int) -> None:
+    """Warn when a single-window decode used up max_new_tokens.
+
+    Only set with compile=True; a transcript that hits it is cut off.
+    """
+    cap = model.generation_config.max_new_tokens
+    if cap is not None and n_tokens >= cap:
+        print(f"[Whisper] Warning: decode hit max_new_tokens ({cap}), "
+              "the transcript may be truncated")
+
+
+def _pipeline_tokens(processor, result: dict) -> int:
+    """Approximate decoder tokens of a pipeline result with timestamps."""
+    text_tokens = processor.tokenizer(result["text"], add_special_tokens=False).input_ids
+    # A start and an end timestamp token per segment
+    return len(text_tokens) + 2 * len(result.get("chunks") or ())
+
+
+def warmup_whisper(asr_pipeline, processor) -> dict:
+    """Run a synthetic recording through transcribe() twice.
+
+    The first call pays for kernel selection, allocator growth and (with
+    compile=True) compilation; the second shows the warm latency. Returns
+    {"seconds", "cold_seconds", "warm_seconds"}.
+    """
+    sample_rate = processor.feature_extractor.sampling_rate
+    rng = np.random.default_rng(0)
+    audio = (0.01 * rng.standard_normal(int(WARMUP_AUDIO_SECONDS * sample_rate))).astype(np.float32)
+
+    timings = []
+    for _ in range(2):
+        start = time.time()
+        transcribe(asr_pipeline, processor, audio)
+        timings.append(time.time() - start)
+    stats = {"seconds": sum(timings), "cold_seconds": timings[0], "warm_seconds": timings[1]}
+    print(f"Whisper warm-up {stats['seconds']:.2f}s "
+          f"(first request {stats['cold_seconds']:.2f}s -> {stats['warm_seconds']:.2f}s warm)")
+    return stats
+
+
+def _prompt_ids(asr_pipeline, processor) -> torch.Tensor:
+    """Tokenized WHISPER_INITIAL_PROMPT on the pipeline's device (cached)."""
     device = asr_pipeline.device
-    prompt_ids = processor.get_prompt_ids(WHISPER_INITIAL_PROMPT, return_tensors="pt").to(device)
+    key = (id(processor), str(device), WHISPER_INITIAL_PROMPT)
+    prompt_ids = _prompt_ids_cache.get(key)
+    if prompt_ids is None:
+        prompt_ids = processor.get_prompt_ids(WHISPER_INITIAL_PROMPT, return_tensors="pt").to(device)
+        _prompt_ids_cache[key] = prompt_ids
+    return prompt_ids
+
+
+def _generate_kwargs(asr_pipeline, processor) -> dict:
+    """Whisper generate kwargs shared by single and batched transcription."""
+    return {**WHISPER_GENERATE_KWARGS, "prompt_ids": _prompt_ids(asr_pipeline, processor)}
+
+
+def transcribe(asr_pipeline, processor, audio: np.ndarray, *, chunked: bool = False) -> str:
+    """Transcribe audio using the Whisper pipeline.
+
+    With chunked=True, audio longer than MAX_BATCH_AUDIO_SECONDS goes
+    through transcribe_long() instead of Whisper's sequential long-form path.
+    """
+    if chunked and len(audio) > MAX_BATCH_AUDIO_SECONDS * processor.feature_extractor.sampling_rate:
+        return transcribe_long(asr_pipeline, processor, audio)
+    generate_kwargs = _generate_kwargs(asr_pipeline, processor)
 
     start = time.time()
 
-    result = asr_pipeline(
-        audio,
-        return_timestamps=True,
-        generate_kwargs={
-            "language": "zh",
-            "task": "transcribe",
-            "prompt_ids": prompt_ids,
-        },
-    )
+    with tracing.span("whisper.lock_wait"):
+        _pipeline_lock.acquire()
+    try:
+        # Feature extraction, generate() and decoding inside the pipeline
+        with tracing.span("whisper.pipeline", samples=len(audio)):
+            result = asr_pipeline(
+                audio,
+                return_timestamps=True,
+                generate_kwargs=generate_kwargs,
+            )
+    finally:
+        _pipeline_lock.release()
 
+    model = asr_pipeline.model
+    # Long-form decoding applies the cap per window, which the text cannot show
+    single_window = len(audio) <= processor.feature_extractor.n_samples
+    if model.generation_config.max_new_tokens is not None and single_window:
+        _warn_if_capped(model, _pipeline_tokens(processor, result))
     elapsed = time.time() - start
-    text = _normalize_punctuation(result["text"])
+    with tracing.span("whisper.normalize"):
+        text = _normalize_punctuation(result["text"])
     print(f"Whisper result ({elapsed:.2f}s): {text}")
     return text
+
+
+def transcribe_batch(asr_pipeline, processor, audios: list[np.ndarray]) -> list[str]:
+    """Transcribe several recordings, batching those that fit in one Whisper window.
+
+    Recordings longer than MAX_BATCH_AUDIO_SECONDS go through transcribe()
+    one at a time, since long-form decoding is sequential anyway.
+    """
+    sample_rate = processor.feature_extractor.sampling_rate
+    max_samples = int(MAX_BATCH_AUDIO_SECONDS * sample_rate)
+    texts: list[str | None] = [None] * len(audios)
+    short = [i for i, audio in enumerate(audios) if len(audio) <= max_samples]
+
+    if short:
+        generate_kwargs = _generate_kwargs(asr_pipeline, processor)
+        start = time.time()
+        with _pipeline_lock, tracing.span("whisper.pipeline_batch", batch=len(short)):
+            results = asr_pipeline(
+                [audios[i] for i in short],
+                batch_size=len(short),
+                return_timestamps=True,
+                generate_kwargs=generate_kwargs,
+            )
+        model = asr_pipeline.model
+        for i, result in zip(short, results):
+            if model.generation_config.max_new_tokens is not None:
+                _warn_if_capped(model, _pipeline_tokens(processor, result))
+            texts[i] = _normalize_punctuation(result["text"])
+        elapsed = time.time() - start
+        print(f"Whisper batch of {len(short)} ({elapsed:.2f}s)")
+
+    for i, audio in enumerate(audios):
+        if texts[i] is None:
+            texts[i] = transcribe(asr_pipeline, processor, audio)
+    return texts
+
+
+def extract_features(processor, audio: np.ndarray) -> dict:
+    """Compute Whisper log-mel input features for one recording.
+
+    Audio that fits in one window is padded to the full window as the
+    pipeline does; longer audio keeps all frames plus an attention mask so
+    generate() takes the long-form path. Safe to call from a worker thread.
+    """
+    feature_extractor = processor.feature_extractor
+    if len(audio) <= feature_extractor.n_samples:
+        with tracing.span("whisper.features", samples=len(audio)):
+            out = feature_extractor(
+                audio, sampling_rate=feature_extractor.sampling_rate, return_tensors="np"
+            )
+        return {"input_features": out["input_features"][0], "attention_mask": None}
+    with tracing.span("whisper.features", samples=len(audio)):
+        out = feature_extractor(
+            audio,
+            sampling_rate=feature_extractor.sampling_rate,
+            truncation=False,
+            padding="longest",
+            return_attention_mask=True,
+            return_tensors="np",
+        )
+    return {
+        "input_features": out["input_features"][0],
+        "attention_mask": out["attention_mask"][0],
+    }
+
+
+def encode_features(asr_pipeline, features: list[dict]) -> list[np.ndarray]:
+    """Run the Whisper encoder over single-window extract_features() items.
+
+    Returns one (frames, hidden size) array of encoder states per item, in
+    float16 if the model runs in float16 and float32 otherwise.
+    """
+    model = asr_pipeline.model
+    input_features = torch.from_numpy(
+        np.stack([f["input_features"] for f in features])
+    ).to(model.device, getattr(model, "dtype", torch.float32))
+    with _pipeline_lock, torch.no_grad(), tracing.span("whisper.encode", batch=len(features)):
+        states = model.get_encoder()(input_features).last_hidden_state
+    if states.dtype != torch.float16:
+        states = states.float()
+    return list(states.cpu().numpy())
+
+
+def transcribe_features(asr_pipeline, processor, features: list[dict],
+                        encoder_states: list[np.ndarray | None] | None = None) -> list[str]:
+    """Transcribe precomputed features from extract_features().
+
+    Single-window items are stacked into one generate() call; long-form
+    items are decoded one at a time. Single-window items that have
+    precomputed encoder_states (from encode_features()) skip the encoder.
+    """
+    model = asr_pipeline.model
+    dtype = getattr(model, "dtype", torch.float32)
+    generate_kwargs = _generate_kwargs(asr_pipeline, processor)
+    texts: list[str | None] = [None] * len(features)
+    if encoder_states is None:
+        encoder_states = [None] * len(features)
+
+    windows = [i for i, f in enumerate(features) if f["attention_mask"] is None]
+    encoded = [i for i in windows if encoder_states[i] is not None]
+    windows = [i for i in windows if encoder_states[i] is None]
+    groups = [group for group in (encoded, windows) if group]
+    groups += [[i] for i, f in enumerate(features) if f["attention_mask"] is not None]
+
+    start = time.time()
+    for group in groups:
+        if encoder_states[group[0]] is not None:
+            hidden = torch.from_numpy(
+                np.stack([encoder_states[i] for i in group])
+            ).to(model.device, dtype)
+            inputs = {"encoder_outputs": BaseModelOutput(last_hidden_state=hidden)}
+        else:
+            inputs = {"input_features": torch.from_numpy(
+                np.stack([features[i]["input_features"] for i in group])
+            ).to(model.device, dtype)}
+        if features[group[0]]["attention_mask"] is not None:
+            inputs["attention_mask"] = torch.from_numpy(
+                features[group[0]]["attention_mask"][None]
+            ).to(model.device)
+        with _pipeline_lock, torch.no_grad(), tracing.span("whisper.generate", batch=len(group)):
+            token_ids = model.generate(
+                **inputs, return_timestamps=True, **generate_kwargs
+            )
+        if features[group[0]]["attention_mask"] is None:
+            # Finished rows are padded with end-of-text up to the longest one
+            eos = model.generation_config.eos_token_id
+            for row in token_ids:
+                _warn_if_capped(model, int((row != eos).sum()))
+        with tracing.span("whisper.decode", batch=len(group)):
+            decoded = processor.batch_decode(token_ids, skip_special_tokens=True)
+        for i, text in zip(group, decoded):
+            texts[i] = _normalize_punctuation(text)
+
+    elapsed = time.time() - start
+    print(f"Whisper features batch of {len(features)} ({elapsed:.2f}s)")
+    return texts
+
+
+def transcribe_long(asr_pipeline, processor, audio: np.ndarray) -> str:
+    """Transcribe a long recording as a batch of silence-cut windows.
+
+    The audio is split into windows of at most MAX_BATCH_AUDIO_SECONDS at
+    quiet points, the windows are decoded together (LONG_FORM_BATCH_SIZE per
+    generate() call) and the transcripts are stitched with the overlap
+    de-duplicated. Each window is punctuation-normalized like transcribe().
+    """
+    start = time.time()
+    windows = _split_long_audio(audio, processor.feature_extractor.sampling_rate)
+    features = [extract_features(processor, window) for window in windows]
+    texts: list[str] = []
+    for i in range(0, len(features), LONG_FORM_BATCH_SIZE):
+        texts += transcribe_features(asr_pipeline, processor, features[i:i + LONG_FORM_BATCH_SIZE])
+
+    with tracing.span("whisper.stitch", windows=len(texts)):
+        text = texts[0]
+        for segment in texts[1:]:
+            text = _merge_overlap(text, segment)
+    elapsed = time.time() - start
+    print(f"Whisper result ({elapsed:.2f}s, {len(windows)} windows): {text}")
+    return text
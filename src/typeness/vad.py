@@ -0,0 +1,187 @@
+"""Voice-activity detection module for Typeness.
+
+Energy-based VAD over short frames, vectorized with NumPy. Used to trim
+leading/trailing silence (and shorten long pauses) before Whisper, and to
+end a recording automatically after a stretch of silence.
+"""
+
+import numpy as np
+
+from typeness.audio import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+# A frame is speech if it is this much louder than the noise floor...
+SPEECH_MARGIN_DB = 12.0
+# ...and louder than this absolute level (dBFS)
+MIN_SPEECH_DB = -50.0
+# Speech regions are padded by this much on both sides so word onsets and
+# trailing consonants are kept
+SPEECH_PAD_SECONDS = 0.2
+# Pauses inside the recording longer than this are shortened to this length
+MAX_PAUSE_SECONDS = 1.0
+# SilenceDetector estimates the noise floor over this much recent audio
+NOISE_WINDOW_SECONDS = 10.0
+
+_FRAME = int(FRAME_SECONDS * SAMPLE_RATE)
+_FLOOR_DB = -100.0
+
+
+def frame_energy_db(audio: np.ndarray) -> np.ndarray:
+    """RMS level in dBFS of each full FRAME_SECONDS frame of audio."""
+    n_frames = len(audio) // _FRAME
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = audio[: n_frames * _FRAME].reshape(n_frames, _FRAME)
+    power = np.mean(frames * frames, axis=1)
+    return np.maximum(10.0 * np.log10(power + 1e-12), _FLOOR_DB)
+
+
+def _threshold_db(noise_floor_db: float, loudest_db: float) -> float:
+    """Speech threshold for a noise floor estimate.
+
+    If nothing is SPEECH_MARGIN_DB above the floor (e.g. the recording is
+    speech throughout), the floor is speech too and only MIN_SPEECH_DB applies.
+    """
+    threshold = noise_floor_db + SPEECH_MARGIN_DB
+    if threshold >= loudest_db:
+        return MIN_SPEECH_DB
+    return max(threshold, MIN_SPEECH_DB)
+
+
+def _speech_frames(energy: np.ndarray) -> np.ndarray:
+    """Unpadded speech flags; the noise floor is the 10th percentile level."""
+    floor = float(np.percentile(energy, 10))
+    return energy > _threshold_db(floor, float(energy.max()))
+
+
+def speech_mask(audio: np.ndarray) -> np.ndarray:
+    """Boolean speech flag per frame, padded by SPEECH_PAD_SECONDS."""
+    energy = frame_energy_db(audio)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    mask = _speech_frames(energy)
+    pad = int(SPEECH_PAD_SECONDS / FRAME_SECONDS)
+    if pad and mask.any():
+        # Dilate: a frame is kept if any speech frame lies within pad frames
+        mask = np.convolve(mask, np.ones(2 * pad + 1), mode="same") > 0
+    return mask
+
+
+def speech_seconds(audio: np.ndarray) -> float:
+    """Seconds of detected speech in audio (unpadded).
+
+    If no frame is detected as speech, the raw duration is returned: a
+    recording quieter than MIN_SPEECH_DB throughout (a quiet microphone) is
+    left for Whisper to judge, just as trim_silence() leaves it untrimmed.
+    """
+    energy = frame_energy_db(audio)
+    if len(energy) == 0:
+        return len(audio) / SAMPLE_RATE
+    speech_frames = int(np.count_nonzero(_speech_frames(energy)))
+    if speech_frames == 0:
+        return len(audio) / SAMPLE_RATE
+    return speech_frames * FRAME_SECONDS
+
+
+def trim_silence(audio: np.ndarray, max_pause_seconds: float = MAX_PAUSE_SECONDS) -> np.ndarray:
+    """Drop leading/trailing non-speech and shorten pauses to max_pause_seconds.
+
+    Returns audio unchanged if no speech is detected; the result is a view
+    when only the ends are trimmed.
+    """
+    mask = speech_mask(audio)
+    if not mask.any():
+        return audio
+    speech = np.flatnonzero(mask)
+    first, last = speech[0], speech[-1]
+    max_gap = int(max_pause_seconds / FRAME_SECONDS)
+
+    # Runs of silent frames strictly inside the speech span
+    inner = mask[first:last + 1]
+    edges = np.flatnonzero(np.diff(inner.astype(np.int8)))
+    gap_starts = edges[::2] + 1
+    gap_ends = edges[1::2] + 1
+    long_gaps = (gap_ends - gap_starts) > max_gap
+
+    start = first * _FRAME
+    end = len(audio) if last == len(mask) - 1 else (last + 1) * _FRAME
+    if not long_gaps.any():
+        return audio[start:end]
+
+    keep = np.ones(end - start, dtype=bool)
+    for gap_start, gap_end in zip(gap_starts[long_gaps], gap_ends[long_gaps]):
+        # Keep max_gap frames of the pause, split around its middle
+        cut_start = (gap_start + max_gap // 2) * _FRAME
+        cut_end = (gap_end - (max_gap - max_gap // 2)) * _FRAME
+        keep[cut_start:cut_end] = False
+    return audio[start:end][keep]
+
+
+class SilenceDetector:
+    """Watches a live recording and reports when it has gone quiet.
+
+    feed() takes captured chunks (cheap enough for the audio callback) and
+    returns True once silence_seconds of silence follow detected speech.
+    The noise floor is the 10th percentile level of the last
+    NOISE_WINDOW_SECONDS, as in _speech_frames(), so speech before the first
+    pause is recognized once that pause arrives. All-zero frames (digital
+    silence while the input device starts up) are left out of the estimate;
+    they would pin the floor far below the real room noise.
+    """
+
+    def __init__(self, silence_seconds: float) -> None:
+        self._silence_frames = int(silence_seconds / FRAME_SECONDS)
+        self._carry = np.empty(0, dtype=np.float32)
+        # Ring buffer of recent non-zero frame levels
+        self._history = np.empty(int(NOISE_WINDOW_SECONDS / FRAME_SECONDS), dtype=np.float32)
+        self._history_len = 0
+        self._history_pos = 0
+        self._loudest_db: float | None = None
+        self._silent_run = 0
+        self.triggered = False
+
+    def feed(self, chunk: np.ndarray) -> bool:
+        if self.triggered:
+            return True
+        audio = np.concatenate((self._carry, chunk.reshape(-1)))
+        energy = frame_energy_db(audio)
+        self._carry = audio[len(energy) * _FRAME:]
+        if len(energy) == 0:
+            return False
+
+        self._remember(energy[energy > _FLOOR_DB])
+        if self._history_len == 0:
+            # Nothing but digital silence so far
+            self._silent_run += len(energy)
+            return False
+        recent = self._history[:self._history_len]
+        noise_floor = float(np.percentile(recent, 10))
+        loudest = float(energy.max())
+        if self._loudest_db is None or loudest > self._loudest_db:
+            self._loudest_db = loudest
+        threshold = _threshold_db(noise_floor, self._loudest_db)
+        speech = energy > threshold
+
+        if speech.any():
+            # Silent frames after the last speech frame in this chunk
+            self._silent_run = len(speech) - 1 - int(np.flatnonzero(speech)[-1])
+        else:
+            self._silent_run += len(speech)
+        heard_speech = self._loudest_db > threshold
+        if heard_speech and self._silent_run >= self._silence_frames:
+            self.triggered = True
+        return self.triggered
+
+    def _remember(self, levels: np.ndarray) -> None:
+        """Append frame levels to the ring buffer, overwriting the oldest."""
+        size = len(self._history)
+        levels = levels[-size:]
+        end = self._history_pos + len(levels)
+        if end <= size:
+            self._history[self._history_pos:end] = levels
+        else:
+            split = size - self._history_pos
+            self._history[self._history_pos:] = levels[:split]
+            self._history[:end - size] = levels[split:]
+        self._history_pos = end % size
+        self._history_len = min(self._history_len + len(levels), size)